@@ -0,0 +1,390 @@
+"""Generate and publish many tests from a manifest, without the Streamlit UI.
+
+The manifest is a CSV or JSONL file with one test per row:
+
+    teacher_name, subject, topics, num_questions, difficulty,
+    additional_info (optional), exam_duration_minutes (optional, default 60),
+    id (optional, used to track the row when resuming)
+
+In CSV files topics are separated by ";". Progress is written to a state
+file next to the manifest, so an interrupted run picks up where it stopped.
+
+    python batch_cli.py weekly_tests.csv --concurrency 4
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import metrics
+from config import LLM_BACKEND
+from llm_backends import BACKENDS
+from publish_outbox import TestIdTaken
+from storage import replication_status
+from syllabus import syllabus
+from teacher_app import (
+    TEST_ID_ATTEMPTS,
+    GenerationError,
+    build_test_data,
+    generate_questions,
+    generate_test_id,
+    publish_test,
+    reserve_test_ids,
+    save_tests_to_github
+)
+
+DEFAULT_CONCURRENCY = 2         # Tests generated at once (each test also runs its chunks concurrently)
+DEFAULT_DURATION_MINUTES = 60
+UPLOAD_WAIT_SECONDS = 300       # How long to wait for background GitHub uploads before exiting
+STAGES = ["prompt", "llm", "parse", "dedup", "save"]
+
+
+def load_manifest(path):
+    """Read manifest rows from a CSV or JSONL file"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    tests = []
+    for i, row in enumerate(rows, start=1):
+        topics = row.get("topics") or []
+        if isinstance(topics, str):
+            topics = [topic.strip() for topic in topics.split(";") if topic.strip()]
+        config = {
+            "teacher_name": (row.get("teacher_name") or "").strip(),
+            "subject": row.get("subject"),
+            "topics": topics,
+            "additional_info": row.get("additional_info") or "",
+            "num_questions": int(row.get("num_questions") or 0),
+            "difficulty": row.get("difficulty") or "Mix",
+            "exam_duration_minutes": int(row.get("exam_duration_minutes") or DEFAULT_DURATION_MINUTES)
+        }
+        tests.append((str(row.get("id") or f"row{i}"), config))
+    return tests
+
+
+def validate_config(config):
+    """Return a problem with a manifest row, or None"""
+    if not config["teacher_name"]:
+        return "teacher_name is required"
+    if config["subject"] not in syllabus:
+        return f"unknown subject: {config['subject']}"
+    if config["num_questions"] <= 0:
+        return "num_questions must be positive"
+    if config["difficulty"] not in ("Easy", "Medium", "Hard", "Mix"):
+        return f"unknown difficulty: {config['difficulty']}"
+    if not config["topics"] and not config["additional_info"]:
+        return "at least one topic or additional_info is required"
+    return None
+
+
+def config_hash(config):
+    """Fingerprint of a row, so edited rows are not skipped on resume"""
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+class BatchState:
+    """Per-row progress, saved atomically after every change"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.rows = json.load(f)
+        except (OSError, ValueError):
+            self.rows = {}
+
+    def get(self, key, config):
+        """Saved entry for a row, or None if it has not run or was edited since"""
+        with self.lock:
+            entry = self.rows.get(key)
+        if entry and entry.get("config_hash") == config_hash(config):
+            return entry
+        return None
+
+    def update(self, key, config, **fields):
+        with self.lock:
+            entry = self.rows.setdefault(key, {})
+            if entry.get("config_hash") != config_hash(config):
+                entry.clear()
+                entry["config_hash"] = config_hash(config)
+            entry.update(fields)
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.rows, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def generate_test(config, api_key, force_fresh, backend):
+    """Generate the questions for one row. Returns (questions, timings, report).
+
+    Raises GenerationError if no questions could be generated.
+    """
+    timings = {}
+    report = {}
+    questions = generate_questions(
+        api_key,
+        config["subject"],
+        config["topics"],
+        config["additional_info"],
+        config["num_questions"],
+        config["difficulty"],
+        syllabus,
+        force_fresh,
+        timings=timings,
+        report=report,
+        backend=backend
+    )
+    return questions, timings, report
+
+
+def publish_generated(config, questions, token):
+    """Publish one test to the configured storage. Returns (success, message, test_id)."""
+    date_str = datetime.now().strftime("%Y%m%d")
+    for _ in range(TEST_ID_ATTEMPTS):
+        test_id = generate_test_id(config["teacher_name"], date_str)
+        test_data = build_test_data(
+            config["teacher_name"],
+            test_id,
+            config["subject"],
+            config["topics"],
+            config["additional_info"],
+            config["difficulty"],
+            config["exam_duration_minutes"],
+            questions
+        )
+        try:
+            success, message = publish_test(test_data, test_id, token)
+            return success, message, test_id
+        except TestIdTaken:
+            continue
+    return False, "Could not reserve a unique test ID", None
+
+
+def format_timings(timings):
+    return ", ".join(f"{stage} {timings[stage]:.2f}s" for stage in STAGES if stage in timings)
+
+
+def run_row(key, config, args, state, progress):
+    """Run one manifest row. Returns its timings, or None if it failed."""
+    started = time.perf_counter()
+    entry = state.get(key, config)
+    if entry and entry.get("status") == "generated":
+        questions, timings = entry["questions"], dict(entry["timings"])
+    else:
+        try:
+            questions, timings, report = generate_test(config, args.api_key, args.force_fresh, args.backend)
+        except GenerationError as e:
+            questions, report = None, {"errors": [str(e)]}
+        if not questions:
+            error = "; ".join(report["errors"]) or "every question nearly repeats a published test"
+            state.update(key, config, status="failed", error=error)
+            progress(key, f"failed: {error}")
+            return None
+        for error in report["errors"]:
+            progress(key, f"warning: part of the test failed: {error}")
+        if report["missing"]:
+            progress(key, f"warning: {report['missing']} question(s) missing or invalid in the AI response")
+        if report["duplicates"]:
+            progress(key, f"warning: removed {report['duplicates']} question(s) that nearly repeat a published test")
+        state.update(key, config, status="generated", questions=questions, timings=timings)
+
+    if len(questions) < config["num_questions"]:
+        progress(key, f"warning: only {len(questions)} of {config['num_questions']} questions generated")
+
+    if args.single_commit:
+        progress(key, f"generated {len(questions)} questions in {time.perf_counter() - started:.1f}s ({format_timings(timings)})")
+        return timings
+
+    save_started = time.perf_counter()
+    success, message, test_id = publish_generated(config, questions, args.token)
+    timings["save"] = time.perf_counter() - save_started
+    if not success:
+        state.update(key, config, status="generated", questions=questions, timings=timings, error=message)
+        progress(key, f"failed: {message}")
+        return None
+
+    state.update(key, config, status="done", test_id=test_id, timings=timings)
+    progress(key, f"{test_id} ({len(questions)} questions) in {time.perf_counter() - started:.1f}s ({format_timings(timings)})")
+    return timings
+
+
+def commit_generated(tests, state, token):
+    """Publish all generated rows to GitHub in one commit. Returns the number published."""
+    generated = []
+    for key, config in tests:
+        entry = state.get(key, config)
+        if entry and entry.get("status") == "generated":
+            generated.append((key, config, entry))
+    if not generated:
+        return 0
+
+    # Reserve every teacher's IDs in one step
+    date_str = datetime.now().strftime("%Y%m%d")
+    by_teacher = {}
+    for item in generated:
+        by_teacher.setdefault(item[1]["teacher_name"], []).append(item)
+    files = {}
+    assigned = []
+    for teacher_name, items in by_teacher.items():
+        for test_id, (key, config, entry) in zip(reserve_test_ids(teacher_name, date_str, len(items)), items):
+            files[test_id] = build_test_data(
+                teacher_name,
+                test_id,
+                config["subject"],
+                config["topics"],
+                config["additional_info"],
+                config["difficulty"],
+                config["exam_duration_minutes"],
+                entry["questions"]
+            )
+            assigned.append((key, config, entry, test_id))
+
+    started = time.perf_counter()
+    success, message = save_tests_to_github(files, token)
+    elapsed = time.perf_counter() - started
+    print(message)
+    if not success:
+        return 0
+    for key, config, entry, test_id in assigned:
+        timings = dict(entry["timings"], save=elapsed / len(assigned))
+        state.update(key, config, status="done", test_id=test_id, timings=timings)
+    return len(assigned)
+
+
+def wait_for_uploads(test_ids, timeout):
+    """Wait until background uploads of test_ids finish. Returns IDs still pending."""
+    deadline = time.monotonic() + timeout
+    pending = list(test_ids)
+    while pending and time.monotonic() < deadline:
+        pending = [
+            test_id for test_id in pending
+            if (replication_status(test_id) or "done").split(" ")[0] in ("pending", "retrying")
+        ]
+        if pending:
+            time.sleep(1)
+    return pending
+
+
+def print_summary(all_timings, failed, skipped, elapsed):
+    print(f"\nFinished in {elapsed:.1f}s: {len(all_timings)} succeeded, {failed} failed, {skipped} already done")
+    if not all_timings:
+        return
+    print(f"{'stage':<8}{'total':>10}{'mean':>10}{'max':>10}")
+    for stage in STAGES:
+        values = [timings[stage] for timings in all_timings if stage in timings]
+        if values:
+            print(f"{stage:<8}{sum(values):>9.2f}s{sum(values) / len(values):>9.2f}s{max(values):>9.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and publish MCQ tests from a CSV or JSONL manifest")
+    parser.add_argument("manifest", help="CSV or JSONL file with one test per row")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", ""),
+                        help="AI backend API key (default: $OPENAI_API_KEY)")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=LLM_BACKEND,
+                        help=f"AI backend to generate with (default: {LLM_BACKEND}, from $MCQ_LLM_BACKEND)")
+    parser.add_argument("--token", default=os.environ.get("MCQ_GITHUB_TOKEN"),
+                        help="GitHub token for publishing (default: $MCQ_GITHUB_TOKEN)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Tests generated at the same time")
+    parser.add_argument("--state", help="Progress file (default: <manifest>.state.json)")
+    parser.add_argument("--single-commit", action="store_true",
+                        help="Publish all tests to GitHub in one commit at the end instead of one by one")
+    parser.add_argument("--force-fresh", action="store_true", help="Ignore cached AI responses")
+    parser.add_argument("--wait", type=float, default=UPLOAD_WAIT_SECONDS,
+                        help="Seconds to wait for background GitHub uploads before exiting")
+    parser.add_argument("--metrics",
+                        help="Write latency, token and GitHub metrics to this file (.json for JSON, otherwise Prometheus text)")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+
+    tests = load_manifest(args.manifest)
+    state = BatchState(args.state or f"{args.manifest}.state.json")
+
+    todo = []
+    failed = skipped = 0
+    for key, config in tests:
+        problem = validate_config(config)
+        entry = state.get(key, config)
+        if problem:
+            print(f"[{key}] skipped: {problem}")
+            failed += 1
+        elif entry and entry.get("status") == "done":
+            skipped += 1
+        else:
+            todo.append((key, config))
+
+    print(f"{len(todo)} test(s) to run, {skipped} already done")
+    started = time.perf_counter()
+    completed = [0]
+    progress_lock = threading.Lock()
+
+    def progress(key, message):
+        with progress_lock:
+            if not message.startswith("warning"):
+                completed[0] += 1
+                print(f"[{completed[0]}/{len(todo)}] {key}: {message}")
+            else:
+                print(f"[{key}] {message}")
+
+    all_timings = []
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        futures = {executor.submit(run_row, key, config, args, state, progress): key for key, config in todo}
+        for future in as_completed(futures):
+            try:
+                timings = future.result()
+            except Exception as e:
+                progress(futures[future], f"failed: {e}")
+                timings = None
+            if timings is None:
+                failed += 1
+            else:
+                all_timings.append(timings)
+
+    if args.single_commit:
+        published = commit_generated(tests, state, args.token)
+        failed += len(all_timings) - published
+        all_timings = [
+            state.get(key, config)["timings"] for key, config in todo
+            if (state.get(key, config) or {}).get("status") == "done"
+        ]
+    else:
+        published_ids = [
+            state.get(key, config)["test_id"] for key, config in todo
+            if (state.get(key, config) or {}).get("status") == "done"
+        ]
+        pending = wait_for_uploads(published_ids, args.wait)
+        if pending:
+            print(f"{len(pending)} test(s) still waiting for GitHub upload; they resume the next time the app or CLI runs")
+
+    print_summary(all_timings, failed, skipped, time.perf_counter() - started)
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(metrics.render_json() if args.metrics.endswith(".json") else metrics.render_prometheus())
+        print(f"Metrics written to {args.metrics}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import json
+import os
+
+# Local directory for caches, databases and other on-disk state
+DATA_DIR = os.environ.get("MCQ_DATA_DIR", ".mcq_data")
+
+# GitHub configuration
+GITHUB_REPO = "IshantWadhwa4/data_tsmcq"
+GITHUB_PATH = "questions"  # Path where test files will be stored
+GITHUB_BRANCH = "main"
+GITHUB_API_URL = os.environ.get("MCQ_GITHUB_API_URL", "https://api.github.com")
+
+# Storage for published tests: "local", "sqlite", "github", or a primary
+# backend replicated to GitHub in the background, e.g. "local+github"
+STORAGE_BACKEND = os.environ.get("MCQ_STORAGE_BACKEND", "local+github")
+
+# File format for published tests: "json" (compact), "json.gz", "json.zst"
+# (needs zstandard) or "msgpack" (needs msgpack). Readers accept all of them.
+TEST_ENCODING = os.environ.get("MCQ_TEST_ENCODING", "json")
+
+# AI backend: "openai", "local" (any OpenAI-compatible server) or "mock"
+# (the bundled mock_llm_server.py, for offline runs and load tests)
+LLM_BACKEND = os.environ.get("MCQ_LLM_BACKEND", "openai")
+LOCAL_LLM_URL = os.environ.get("MCQ_LOCAL_LLM_URL", "http://localhost:8000/v1")
+MOCK_LLM_URL = os.environ.get("MCQ_MOCK_LLM_URL", "http://127.0.0.1:8765/v1")
+
+# Model used for each difficulty level; override with a JSON object in MCQ_MODELS,
+# e.g. MCQ_MODELS='{"Easy": "gpt-4o-mini"}'
+MODEL_BY_DIFFICULTY = {
+    "Easy": "gpt-4",
+    "Medium": "gpt-4",
+    "Hard": "gpt-4",
+    "Mix": "gpt-4"
+}
+MODEL_BY_DIFFICULTY.update(json.loads(os.environ.get("MCQ_MODELS", "{}")))
+
+# Shared HTTP connection pools (see http_clients.py), reused across sessions
+HTTP_POOL_CONNECTIONS = int(os.environ.get("MCQ_HTTP_POOL_CONNECTIONS", 4))  # Hosts kept in the GitHub pool
+HTTP_POOL_MAXSIZE = int(os.environ.get("MCQ_HTTP_POOL_MAXSIZE", 16))         # Connections per host
+HTTP_TIMEOUT = float(os.environ.get("MCQ_HTTP_TIMEOUT", 30))                 # Seconds per GitHub request
+LLM_MAX_CONNECTIONS = int(os.environ.get("MCQ_LLM_MAX_CONNECTIONS", 32))
+LLM_KEEPALIVE_CONNECTIONS = int(os.environ.get("MCQ_LLM_KEEPALIVE_CONNECTIONS", 16))
+LLM_KEEPALIVE_EXPIRY = float(os.environ.get("MCQ_LLM_KEEPALIVE_EXPIRY", 60))  # Seconds an idle connection is kept
+LLM_CONNECT_TIMEOUT = float(os.environ.get("MCQ_LLM_CONNECT_TIMEOUT", 10))
+LLM_TIMEOUT = float(os.environ.get("MCQ_LLM_TIMEOUT", 300))                   # Seconds per LLM request
+
+# Instrumentation (see metrics.py): MCQ_METRICS=1 collects stage timings, token
+# usage and GitHub latency; MCQ_METRICS_PORT also serves them over HTTP, on
+# MCQ_METRICS_HOST (localhost only unless set, e.g. to 0.0.0.0)
+METRICS_ENABLED = os.environ.get("MCQ_METRICS", "").lower() in ("1", "true", "yes")
+METRICS_PORT = int(os.environ.get("MCQ_METRICS_PORT", 0))
+METRICS_HOST = os.environ.get("MCQ_METRICS_HOST", "127.0.0.1")
@@ -0,0 +1,190 @@
+import base64
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from config import GITHUB_API_URL, GITHUB_BRANCH, GITHUB_PATH, GITHUB_REPO, HTTP_TIMEOUT, TEST_ENCODING
+from http_clients import get_http_session
+from serialization import ENCODINGS
+
+# ETag cache for conditional GETs: (url, token hash) -> (etag, json body),
+# least recently used first. Every commit adds a git/commits/<sha> entry.
+ETAG_CACHE_ENTRIES = 256
+_etags = OrderedDict()
+_etags_lock = threading.Lock()
+
+
+def _endpoint(path):
+    """Metric label for an API path: contents, git/trees, git/commits, ..."""
+    parts = path.split("/")
+    return "/".join(parts[:2]) if parts[0] == "git" else parts[0]
+
+
+def test_file_path(test_id, encoding=TEST_ENCODING):
+    """Repository path of a test file"""
+    return f"{GITHUB_PATH}/{test_id}{ENCODINGS[encoding]}"
+
+
+class GitHubError(Exception):
+    """Raised when a GitHub API call fails"""
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.response = response
+        super().__init__(f"{response.status_code} - {response.text}")
+
+
+class GitHubPublisher:
+    """Write test files to the GitHub repository.
+
+    Single files go through the Contents API. Many files are written with
+    the Git Data API as one tree and one commit, so a batch of tests costs a
+    fixed number of requests instead of one commit per test.
+    """
+
+    def __init__(self, token, repo=GITHUB_REPO, branch=GITHUB_BRANCH, api_url=GITHUB_API_URL, session=None):
+        self.repo = repo
+        self.branch = branch
+        self.api_url = api_url.rstrip("/")
+        self.session = session or get_http_session()
+        self.headers = {"Accept": "application/vnd.github.v3+json"}
+        if token:
+            self.headers["Authorization"] = f"token {token}"
+        # Reads from a public repository work without a token
+        self.token_hash = hashlib.sha256((token or "").encode()).hexdigest()
+
+    def _url(self, path):
+        return f"{self.api_url}/repos/{self.repo}/{path}"
+
+    def _send(self, method, path, headers=None, **kwargs):
+        """Make one API call, recording its latency and status"""
+        endpoint = _endpoint(path)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self._url(path), headers=headers or self.headers, timeout=HTTP_TIMEOUT, **kwargs
+            )
+        except Exception:
+            metrics.GITHUB_REQUESTS.inc(method=method, endpoint=endpoint, status="error")
+            raise
+        metrics.GITHUB_REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, endpoint=endpoint)
+        metrics.GITHUB_REQUESTS.inc(method=method, endpoint=endpoint, status=str(response.status_code))
+        return response
+
+    def _request(self, method, path, expected, **kwargs):
+        response = self._send(method, path, **kwargs)
+        if response.status_code not in expected:
+            raise GitHubError(response)
+        return response
+
+    def _get(self, path):
+        """GET with If-None-Match, reusing the cached body on 304 Not Modified"""
+        cache_key = (self._url(path), self.token_hash)
+        with _etags_lock:
+            cached = _etags.get(cache_key)
+            if cached:
+                _etags.move_to_end(cache_key)
+
+        headers = dict(self.headers)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        response = self._send("GET", path, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        if response.status_code != 200:
+            raise GitHubError(response)
+
+        body = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            with _etags_lock:
+                _etags[cache_key] = (etag, body)
+                _etags.move_to_end(cache_key)
+                while len(_etags) > ETAG_CACHE_ENTRIES:
+                    _etags.popitem(last=False)
+        return body
+
+    def put_file(self, path, content, message):
+        """Create a single file with the Contents API. content may be text or bytes."""
+        if isinstance(content, str):
+            content = content.encode()
+        data = {
+            "message": message,
+            "content": base64.b64encode(content).decode(),
+            "branch": self.branch
+        }
+        return self._request("PUT", f"contents/{path}", (201,), json=data).json()
+
+    def get_file(self, path):
+        """Return the content of a file as bytes, or None if it does not exist"""
+        response = self._send("GET", f"contents/{path}", params={"ref": self.branch})
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise GitHubError(response)
+        return base64.b64decode(response.json()["content"])
+
+    def fetch_file(self, path, etag=None):
+        """Conditional GET of a file. Returns (bytes, etag); bytes is None if unchanged since etag."""
+        headers = dict(self.headers, Accept="application/vnd.github.v3.raw")
+        if etag:
+            headers["If-None-Match"] = etag
+        response = self._send("GET", f"contents/{path}", headers=headers, params={"ref": self.branch})
+        if response.status_code == 304:
+            return None, etag
+        if response.status_code != 200:
+            raise GitHubError(response)
+        return response.content, response.headers.get("ETag")
+
+    def commit_files(self, files, message, attempts=2):
+        """Create or update many files in a single commit. Returns the commit SHA.
+
+        files maps repository paths to text or bytes. Binary content is
+        uploaded as blobs first, since tree entries can only carry text. If
+        the branch moves while the commit is being built, the commit is
+        rebuilt on the new head.
+        """
+        entries = [self._tree_entry(path, content) for path, content in files.items()]
+        for attempt in range(attempts):
+            ref = self._get(f"git/ref/heads/{self.branch}")
+            head_sha = ref["object"]["sha"]
+            # Commits are immutable, so this is answered from the ETag cache after the first call
+            head_commit = self._get(f"git/commits/{head_sha}")
+
+            tree = self._request("POST", "git/trees", (201,), json={
+                "base_tree": head_commit["tree"]["sha"],
+                "tree": entries
+            }).json()
+
+            commit = self._request("POST", "git/commits", (201,), json={
+                "message": message,
+                "tree": tree["sha"],
+                "parents": [head_sha]
+            }).json()
+
+            try:
+                self._request("PATCH", f"git/refs/heads/{self.branch}", (200,), json={
+                    "sha": commit["sha"],
+                    "force": False
+                })
+                return commit["sha"]
+            except GitHubError as e:
+                # 422 means the branch moved (not a fast-forward); retry on the new head
+                if e.status_code != 422 or attempt == attempts - 1:
+                    raise
+
+    def _tree_entry(self, path, content):
+        entry = {"path": path, "mode": "100644", "type": "blob"}
+        if isinstance(content, bytes):
+            try:
+                content = content.decode("utf-8")
+            except UnicodeDecodeError:
+                blob = self._request("POST", "git/blobs", (201,), json={
+                    "content": base64.b64encode(content).decode(),
+                    "encoding": "base64"
+                }).json()
+                return dict(entry, sha=blob["sha"])
+        return dict(entry, content=content)
@@ -0,0 +1,136 @@
+"""Bulk grading of student submissions against a published test's answer key.
+
+A submission is a dict with the student's answers, either as a list of
+letters in question order or as a mapping of question number to letter:
+
+    {"student_name": "John Doe", "answers": ["A", "C", None, "B"]}
+    {"student_name": "Jane Roe", "answers": {"1": "A", "2": "C", "4": "B"}}
+
+Answers are encoded once into a students x questions array, so scoring a
+whole school (or re-scoring after an answer key fix) is a few NumPy
+operations instead of a Python loop per submission.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from mcq_parser import DIFFICULTY_LEVELS, OPTION_KEYS
+
+UNANSWERED = -1
+_LETTER_CODES = {letter: code for code, letter in enumerate(OPTION_KEYS)}
+
+# Answer key compiled from a test:
+#   correct      - int8 array of option codes (0-3 for A-D), one per question
+#   topics       - topic names; topic_ids maps each question to one of them
+#   difficulties - difficulty names; difficulty_ids maps each question to one of them
+AnswerKey = namedtuple("AnswerKey", ["correct", "topics", "topic_ids", "difficulties", "difficulty_ids"])
+
+# Scores for a batch of students (rows follow the order of the submissions):
+#   correct            - bool array, students x questions
+#   totals             - correct answers per student
+#   percentages        - totals as a percentage of the number of questions
+#   topic_scores       - correct answers per student and topic (columns follow key.topics)
+#   difficulty_scores  - correct answers per student and difficulty (columns follow key.difficulties)
+GradeReport = namedtuple("GradeReport", ["correct", "totals", "percentages", "topic_scores", "difficulty_scores"])
+
+
+def _group_ids(values):
+    """Map values to (distinct names in first-seen order, int array of ids)"""
+    names = list(dict.fromkeys(values))
+    lookup = {name: i for i, name in enumerate(names)}
+    return tuple(names), np.array([lookup[value] for value in values], dtype=np.int32)
+
+
+def load_answer_key(test_data):
+    """Compile a published test's questions into an AnswerKey"""
+    questions = test_data['questions']
+    correct = np.array([_LETTER_CODES.get(q.get('correct_answer'), UNANSWERED) for q in questions], dtype=np.int8)
+    topics, topic_ids = _group_ids([q.get('topic') or "Other" for q in questions])
+    difficulties, difficulty_ids = _group_ids([
+        q.get('difficulty') if q.get('difficulty') in DIFFICULTY_LEVELS else "Medium" for q in questions
+    ])
+    return AnswerKey(correct, topics, topic_ids, difficulties, difficulty_ids)
+
+
+def _column(number):
+    """0-based column for a question number key like "3" or 3, or None if it is not a number"""
+    try:
+        return int(number) - 1
+    except (TypeError, ValueError):
+        return None
+
+
+def encode_answers(submissions, num_questions):
+    """Encode submissions into an int8 students x questions array (-1 = unanswered).
+
+    Malformed entries (question numbers that are not numbers or out of range,
+    answers that are not a list or mapping) are left unanswered rather than
+    failing the whole batch.
+    """
+    responses = np.full((len(submissions), num_questions), UNANSWERED, dtype=np.int8)
+    for row, submission in enumerate(submissions):
+        answers = submission.get('answers') if isinstance(submission, dict) else None
+        if isinstance(answers, dict):
+            items = ((_column(number), letter) for number, letter in answers.items())
+        elif isinstance(answers, list):
+            items = enumerate(answers)
+        else:
+            continue
+        for column, letter in items:
+            if column is not None and 0 <= column < num_questions:
+                responses[row, column] = _LETTER_CODES.get(str(letter).strip().upper() if letter else None, UNANSWERED)
+    return responses
+
+
+def _group_sums(correct, group_ids, num_groups):
+    """Sum a students x questions array into students x groups"""
+    one_hot = np.zeros((correct.shape[1], num_groups), dtype=np.int32)
+    one_hot[np.arange(correct.shape[1]), group_ids] = 1
+    return correct.astype(np.int32) @ one_hot
+
+
+def grade(answer_key, responses):
+    """Score an encoded response array against an answer key"""
+    correct = responses == answer_key.correct
+    # A question without a valid key letter cannot be answered correctly
+    correct &= answer_key.correct != UNANSWERED
+    totals = correct.sum(axis=1)
+    num_questions = len(answer_key.correct)
+    percentages = totals * (100.0 / num_questions) if num_questions else np.zeros(len(totals))
+    return GradeReport(
+        correct,
+        totals,
+        percentages,
+        _group_sums(correct, answer_key.topic_ids, len(answer_key.topics)),
+        _group_sums(correct, answer_key.difficulty_ids, len(answer_key.difficulties))
+    )
+
+
+def question_counts(group_ids, num_groups):
+    """Number of questions in each topic or difficulty group"""
+    return np.bincount(group_ids, minlength=num_groups)
+
+
+def grade_submissions(test_data, submissions):
+    """Grade submissions for a test. Returns one score dict per submission."""
+    answer_key = load_answer_key(test_data)
+    report = grade(answer_key, encode_answers(submissions, len(answer_key.correct)))
+    topic_counts = question_counts(answer_key.topic_ids, len(answer_key.topics))
+    difficulty_counts = question_counts(answer_key.difficulty_ids, len(answer_key.difficulties))
+
+    scores = []
+    for row in range(len(submissions)):
+        scores.append({
+            "total_questions": len(answer_key.correct),
+            "correct_answers": int(report.totals[row]),
+            "score_percentage": round(float(report.percentages[row]), 2),
+            "by_topic": {
+                topic: {"correct": int(report.topic_scores[row, i]), "total": int(topic_counts[i])}
+                for i, topic in enumerate(answer_key.topics)
+            },
+            "by_difficulty": {
+                level: {"correct": int(report.difficulty_scores[row, i]), "total": int(difficulty_counts[i])}
+                for i, level in enumerate(answer_key.difficulties)
+            }
+        })
+    return scores
@@ -0,0 +1,75 @@
+import hashlib
+import importlib
+import threading
+from collections import OrderedDict
+
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    LLM_CONNECT_TIMEOUT,
+    LLM_KEEPALIVE_CONNECTIONS,
+    LLM_KEEPALIVE_EXPIRY,
+    LLM_MAX_CONNECTIONS,
+    LLM_TIMEOUT
+)
+
+# HTTP library the installed openai SDK is built on (httpx, or httpx2 in newer releases)
+_httpx = importlib.import_module(openai.DefaultHttpxClient.__base__.__module__.split(".")[0])
+
+# Most OpenAI clients kept at once (one per API key and base URL)
+MAX_OPENAI_CLIENTS = 64
+
+_lock = threading.Lock()
+_http_session = None
+_llm_http_client = None
+_openai_clients = OrderedDict()
+
+
+def get_http_session():
+    """Return the process-wide pooled requests session (used for GitHub calls)"""
+    global _http_session
+    with _lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def _get_llm_http_client():
+    global _llm_http_client
+    if _llm_http_client is None:
+        _llm_http_client = openai.DefaultHttpxClient(
+            limits=_httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+            ),
+            timeout=openai.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        )
+    return _llm_http_client
+
+
+def get_openai_client(api_key, base_url=None):
+    """Return a shared OpenAI client for a credential and base URL.
+
+    Every client sends its requests through one pooled HTTP client, so
+    warm connections are reused across Streamlit sessions and API keys.
+    """
+    key = (hashlib.sha256(api_key.encode()).hexdigest(), base_url)
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            client = openai.OpenAI(api_key=api_key, base_url=base_url, http_client=_get_llm_http_client())
+            _openai_clients[key] = client
+            if len(_openai_clients) > MAX_OPENAI_CLIENTS:
+                _openai_clients.popitem(last=False)
+        else:
+            _openai_clients.move_to_end(key)
+        return client
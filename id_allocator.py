@@ -0,0 +1,79 @@
+import os
+import threading
+
+from config import DATA_DIR
+from sqlite_store import connect, create_database
+
+# Counter database for test ID allocation
+ID_COUNTER_PATH = os.path.join(DATA_DIR, "test_ids.db")
+
+# Suffixes are zero-padded to three digits so they never clash with the
+# two-digit random suffixes (10-99) used by earlier versions
+SUFFIX_WIDTH = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    prefix TEXT PRIMARY KEY,
+    last_value INTEGER NOT NULL
+);
+"""
+
+
+def test_id_prefix(teacher_name, date_str):
+    """Readable TEACHERNAME_YYYYMMDD prefix shared by a teacher's tests for a day"""
+    # Clean teacher name (remove spaces, convert to uppercase)
+    clean_name = teacher_name.replace(" ", "").upper()
+    return f"{clean_name}_{date_str}"
+
+
+class TestIdAllocator:
+    """Hands out unique test IDs from a local per-prefix counter.
+
+    Each reservation is a single atomic UPDATE in SQLite, so concurrent
+    sessions and processes sharing the data directory never receive the
+    same ID, and no remote existence check is needed.
+    """
+
+    def __init__(self, path=ID_COUNTER_PATH):
+        self.path = path
+        create_database(path, SCHEMA)
+
+    def _connect(self):
+        # Autocommit, reserve() opens its own IMMEDIATE transaction
+        return connect(self.path, isolation_level=None)
+
+    def reserve(self, teacher_name, date_str, count=1):
+        """Reserve count consecutive test IDs and return them as a list"""
+        prefix = test_id_prefix(teacher_name, date_str)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR IGNORE INTO counters (prefix, last_value) VALUES (?, 0)", (prefix,)
+                )
+                conn.execute(
+                    "UPDATE counters SET last_value = last_value + ? WHERE prefix = ?", (count, prefix)
+                )
+                last_value = conn.execute(
+                    "SELECT last_value FROM counters WHERE prefix = ?", (prefix,)
+                ).fetchone()[0]
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        first_value = last_value - count + 1
+        return [f"{prefix}_{value:0{SUFFIX_WIDTH}d}" for value in range(first_value, last_value + 1)]
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator():
+    """Return the process-wide test ID allocator"""
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            _allocator = TestIdAllocator()
+        return _allocator
@@ -0,0 +1,169 @@
+import math
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from config import DATA_DIR
+from grading import encode_answers, grade, load_answer_key
+from mcq_parser import OPTION_KEYS
+from question_bank import question_fingerprint
+from sqlite_store import connect, create_database
+
+# Item analysis database
+ITEM_STATS_PATH = os.path.join(DATA_DIR, "item_stats.db")
+
+# Running sums per question. Scores are each student's fraction correct on
+# the whole test, so sums from different tests can be pooled by fingerprint.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS item_stats (
+    test_id TEXT NOT NULL,
+    question_number INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    responses INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    score_sq_sum REAL NOT NULL DEFAULT 0,
+    correct_score_sum REAL NOT NULL DEFAULT 0,
+    chose_a INTEGER NOT NULL DEFAULT 0,
+    chose_b INTEGER NOT NULL DEFAULT 0,
+    chose_c INTEGER NOT NULL DEFAULT 0,
+    chose_d INTEGER NOT NULL DEFAULT 0,
+    unanswered INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (test_id, question_number)
+);
+CREATE INDEX IF NOT EXISTS idx_item_stats_fingerprint ON item_stats (fingerprint);
+"""
+
+SUM_COLUMNS = ("responses", "correct", "score_sum", "score_sq_sum", "correct_score_sum",
+               "chose_a", "chose_b", "chose_c", "chose_d", "unanswered")
+
+# Item analysis for one question:
+#   responses       - number of submissions counted
+#   p_value         - fraction of students answering correctly (item difficulty)
+#   point_biserial  - correlation between answering correctly and test score
+#                     (item discrimination), None until both groups exist
+#   option_rates    - fraction of students choosing each option A-D
+#   unanswered_rate - fraction of students leaving it blank
+ItemStats = namedtuple("ItemStats", ["responses", "p_value", "point_biserial", "option_rates", "unanswered_rate"])
+
+
+def compute_item_stats(sums):
+    """Turn a row of running sums (see SUM_COLUMNS) into ItemStats"""
+    n, n_correct, score_sum, score_sq_sum, correct_score_sum = sums[:5]
+    option_counts, unanswered = sums[5:9], sums[9]
+    if not n:
+        return None
+
+    p_value = n_correct / n
+    variance = score_sq_sum / n - (score_sum / n) ** 2
+    point_biserial = None
+    if 0 < n_correct < n and variance > 1e-12:
+        mean_correct = correct_score_sum / n_correct
+        mean_incorrect = (score_sum - correct_score_sum) / (n - n_correct)
+        point_biserial = (mean_correct - mean_incorrect) / math.sqrt(variance) * math.sqrt(p_value * (1 - p_value))
+
+    option_rates = {letter: count / n for letter, count in zip(OPTION_KEYS, option_counts)}
+    return ItemStats(n, p_value, point_biserial, option_rates, unanswered / n)
+
+
+class ItemStatsStore:
+    """Per-question running aggregates, updated in O(1) per question per submission.
+
+    Each submission only adds to a fixed set of sums, so statistics never
+    require rescanning past results.
+    """
+
+    def __init__(self, path=ITEM_STATS_PATH):
+        self.path = path
+        create_database(path, SCHEMA)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def record_submissions(self, test_data, submissions):
+        """Add a batch of submissions (see grading.py for the format) to the running sums"""
+        if not submissions:
+            return
+        questions = test_data['questions']
+        answer_key = load_answer_key(test_data)
+        responses = encode_answers(submissions, len(questions))
+        report = grade(answer_key, responses)
+
+        scores = report.totals / max(1, len(questions))
+        correct = report.correct.astype(np.float64)
+        chosen = [(responses == code).sum(axis=0) for code in range(len(OPTION_KEYS))]
+        rows = []
+        for j, question in enumerate(questions):
+            rows.append((
+                test_data['test_id'],
+                question.get('question_number', j + 1),
+                question_fingerprint(question),
+                len(submissions),
+                int(report.correct[:, j].sum()),
+                float(scores.sum()),
+                float((scores ** 2).sum()),
+                float(scores @ correct[:, j]),
+                *(int(counts[j]) for counts in chosen),
+                int((responses[:, j] < 0).sum())
+            ))
+
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in SUM_COLUMNS)
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT INTO item_stats (test_id, question_number, fingerprint, {', '.join(SUM_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (3 + len(SUM_COLUMNS)))}) "
+                f"ON CONFLICT (test_id, question_number) DO UPDATE SET {updates}",
+                rows
+            )
+
+    def record_submission(self, test_data, submission):
+        """Add one submission to the running sums"""
+        self.record_submissions(test_data, [submission])
+
+    def stats_for_test(self, test_id):
+        """Return {question_number: ItemStats} for a test"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT question_number, {', '.join(SUM_COLUMNS)} FROM item_stats WHERE test_id = ?",
+                (test_id,)
+            ).fetchall()
+        return {row[0]: compute_item_stats(row[1:]) for row in rows}
+
+    def stats_for_fingerprints(self, fingerprints):
+        """Return {fingerprint: ItemStats} pooled over every test that used each question"""
+        fingerprints = list(set(fingerprints))
+        if not fingerprints:
+            return {}
+        sums = ", ".join(f"SUM({column})" for column in SUM_COLUMNS)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT fingerprint, {sums} FROM item_stats "
+                f"WHERE fingerprint IN ({', '.join('?' * len(fingerprints))}) GROUP BY fingerprint",
+                fingerprints
+            ).fetchall()
+        return {row[0]: compute_item_stats(row[1:]) for row in rows}
+
+
+def format_item_stats(stats):
+    """One-line summary of ItemStats for the question editor"""
+    discrimination = "n/a" if stats.point_biserial is None else f"{stats.point_biserial:.2f}"
+    options = " ".join(f"{letter} {rate:.0%}" for letter, rate in stats.option_rates.items())
+    return (
+        f"📊 {stats.responses} responses | p-value {stats.p_value:.2f} | "
+        f"discrimination {discrimination} | {options} | blank {stats.unanswered_rate:.0%}"
+    )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_item_stats():
+    """Return the process-wide item statistics store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ItemStatsStore()
+        return _store
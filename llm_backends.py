@@ -0,0 +1,38 @@
+from collections import namedtuple
+
+from config import LLM_BACKEND, LOCAL_LLM_URL, MOCK_LLM_URL, MODEL_BY_DIFFICULTY
+from http_clients import get_openai_client
+
+# An OpenAI-compatible generation backend. base_url None means api.openai.com.
+Backend = namedtuple("Backend", ["name", "label", "base_url", "requires_key"])
+
+BACKENDS = {}
+
+
+def register_backend(name, label, base_url=None, requires_key=True):
+    """Add a backend that can be selected by name"""
+    BACKENDS[name] = Backend(name, label, base_url, requires_key)
+
+
+register_backend("openai", "OpenAI")
+register_backend("local", "Local / self-hosted (OpenAI-compatible)", LOCAL_LLM_URL, requires_key=False)
+register_backend("mock", "Mock server (offline testing)", MOCK_LLM_URL, requires_key=False)
+
+
+def get_backend(name=LLM_BACKEND):
+    """Look up a registered backend"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown AI backend: {name}")
+    return BACKENDS[name]
+
+
+def model_for_level(level):
+    """Model configured for a difficulty level"""
+    return MODEL_BY_DIFFICULTY.get(level, MODEL_BY_DIFFICULTY["Mix"])
+
+
+def get_client(api_key, backend_name=LLM_BACKEND):
+    """Return the shared OpenAI client for a backend and API key"""
+    backend = get_backend(backend_name)
+    # Local servers usually ignore the key, but the client requires one
+    return get_openai_client(api_key or "not-needed", backend.base_url)
@@ -0,0 +1,169 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# Generation settings
+MODEL = "gpt-4"
+TEMPERATURE = 0.7
+MAX_TOKENS = 4000
+SYSTEM_PROMPT = "You are an expert examination question creator. Generate high-quality multiple-choice questions following the exact format requested."
+
+# Chunking settings for large tests
+CHUNK_SIZE = 10        # Maximum questions requested in a single call
+MAX_WORKERS = 4        # Maximum concurrent calls per test
+CHUNK_TIMEOUT = 120    # Seconds before a single chunk call is abandoned
+CHUNK_RETRIES = 2      # Extra attempts for a failed chunk
+RETRY_BACKOFF = 2      # Base seconds between attempts (doubles each retry)
+
+MIX_LEVELS = ["Easy", "Medium", "Hard"]
+
+# Outcome of one chunk: response text and token usage, or the last error
+ChunkResult = namedtuple("ChunkResult", ["text", "usage", "error"])
+
+
+def _split(count, parts):
+    """Split count into parts sizes that differ by at most one, largest first"""
+    base, extra = divmod(count, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def plan_chunks(topics, num_questions, level, chunk_size=CHUNK_SIZE):
+    """Split a test into chunks of at most chunk_size questions.
+
+    Topics are spread across chunks. A "Mix" test is first split into
+    Easy/Medium/Hard thirds, each chunked on its own, so every chunk asks
+    for one difficulty and every difficulty gets its share. Each chunk
+    records its part number (1-based) and the number of parts, so chunks
+    that share topics and difficulty can still be given distinct prompts.
+    """
+    if num_questions <= chunk_size:
+        return [{"topics": list(topics), "num_questions": num_questions, "level": level, "part": 1, "parts": 1}]
+
+    if level == "Mix":
+        groups = zip(MIX_LEVELS, _split(num_questions, len(MIX_LEVELS)))
+    else:
+        groups = [(level, num_questions)]
+    sizes = [
+        (group_level, size)
+        for group_level, count in groups if count
+        for size in _split(count, -(-count // chunk_size))
+    ]
+
+    num_chunks = len(sizes)
+    chunks = []
+    for i, (chunk_level, size) in enumerate(sizes):
+        if len(topics) >= num_chunks:
+            chunk_topics = list(topics[i::num_chunks])
+        elif topics:
+            chunk_topics = [topics[i % len(topics)]]
+        else:
+            chunk_topics = []
+
+        chunks.append({
+            "topics": chunk_topics,
+            "num_questions": size,
+            "level": chunk_level,
+            "part": i + 1,
+            "parts": num_chunks
+        })
+    return chunks
+
+
+def request_completion(client, prompt, max_tokens=MAX_TOKENS, timeout=None, model=MODEL):
+    """Send a single chat completion request and return (response text, token usage)"""
+    started = time.perf_counter()
+    try:
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=TEMPERATURE,
+            max_tokens=max_tokens,
+            timeout=timeout
+        )
+    except Exception:
+        metrics.LLM_REQUESTS.inc(model=model, mode="complete", outcome="error")
+        raise
+    metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, mode="complete")
+    metrics.LLM_REQUESTS.inc(model=model, mode="complete", outcome="ok")
+    metrics.record_usage(model, response.usage)
+    return response.choices[0].message.content, response.usage
+
+
+def stream_completion(client, prompt, max_tokens=MAX_TOKENS, timeout=None, model=MODEL):
+    """Send a streaming chat completion request and yield text as it arrives"""
+    started = time.perf_counter()
+    try:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=TEMPERATURE,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception:
+        metrics.LLM_REQUESTS.inc(model=model, mode="stream", outcome="error")
+        raise
+    metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, mode="stream")
+    metrics.LLM_REQUESTS.inc(model=model, mode="stream", outcome="ok")
+
+
+def _complete_with_retries(client, prompt, max_tokens, timeout, retries, model):
+    """Request a completion, retrying failures with exponential backoff"""
+    for attempt in range(retries + 1):
+        try:
+            text, usage = request_completion(client, prompt, max_tokens=max_tokens, timeout=timeout, model=model)
+            return ChunkResult(text, usage, None)
+        except Exception as e:
+            error = e
+            if attempt < retries:
+                metrics.LLM_RETRIES.inc(model=model)
+                time.sleep(RETRY_BACKOFF * (2 ** attempt))
+    return ChunkResult(None, None, error)
+
+
+def generate_chunks(client, prompts, max_tokens=None, max_workers=MAX_WORKERS, timeout=CHUNK_TIMEOUT, retries=CHUNK_RETRIES, models=None):
+    """Run chunk prompts concurrently.
+
+    max_tokens and models are optional per-prompt lists of output budgets
+    and model names. Returns a
+    ChunkResult per prompt, in prompt order. A chunk that times out or keeps
+    failing has text None and its error set, without holding up the others.
+    """
+    if not prompts:
+        return []
+    if max_tokens is None:
+        max_tokens = [MAX_TOKENS] * len(prompts)
+    if models is None:
+        models = [MODEL] * len(prompts)
+
+    # Retries are handled here so the SDK must not retry on its own as well
+    client = client.with_options(max_retries=0)
+    workers = min(max_workers, len(prompts))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_complete_with_retries, client, prompt, budget, timeout, retries, model)
+            for prompt, budget, model in zip(prompts, max_tokens, models)
+        ]
+        return [future.result() for future in futures]
+
+
+def merge_question_sets(question_sets):
+    """Concatenate chunk results and renumber questions from 1"""
+    questions = []
+    for question_set in question_sets:
+        questions.extend(question_set)
+    for i, question in enumerate(questions):
+        question['question_number'] = i + 1
+    return questions
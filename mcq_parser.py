@@ -0,0 +1,266 @@
+import json
+import re
+from collections import namedtuple
+
+OPTION_KEYS = ("A", "B", "C", "D")
+DIFFICULTY_LEVELS = ("Easy", "Medium", "Hard")
+QUESTION_FIELDS = ("question_text", "options", "correct_answer")
+
+_LETTER_PATTERN = re.compile(r"(?:option|answer|choice)?\s*[(\[]?\s*([A-Da-d1-4])\s*[)\].:]?", re.IGNORECASE)
+# A letter label followed by the option text, e.g. "C) 4" or "Answer: C - Oslo"
+_LABELLED_PATTERN = re.compile(r"(?:(?:option|answer|choice)\s*:?)?\s*[(\[]?\s*([A-Da-d])\s*[)\].:\-]\s*(.+)", re.IGNORECASE | re.DOTALL)
+
+# Other spellings of difficulty labels seen in AI responses
+DIFFICULTY_ALIASES = {
+    "easy": "Easy", "simple": "Easy", "basic": "Easy", "low": "Easy",
+    "medium": "Medium", "moderate": "Medium", "intermediate": "Medium", "average": "Medium",
+    "hard": "Hard", "difficult": "Hard", "tough": "Hard", "advanced": "Hard", "high": "Hard"
+}
+
+# Result of parsing a full response:
+#   questions - valid question dicts in response order
+#   rejected  - (question, problems) pairs for objects that failed validation
+#   missing   - question numbers (1-based) that were expected but not recovered
+#   repaired  - number of valid questions that needed repair_question()
+ParseResult = namedtuple("ParseResult", ["questions", "rejected", "missing", "repaired"])
+
+
+class IncrementalQuestionParser:
+    """Extract complete question objects from a JSON response as it streams in.
+
+    The parser scans every character once, tracking JSON strings and bracket
+    nesting. Whenever an object that sits directly inside an array is closed
+    it is decoded and, if it looks like a question, returned by feed().
+    Surrounding prose, markdown code fences and a truncated tail are ignored.
+    Returned objects are not validated; see validate_question().
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+
+    def feed(self, text):
+        """Add streamed text and return any newly completed questions"""
+        self.buffer += text
+        completed = []
+
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                if self.stack:
+                    self.in_string = True
+            elif char in "{[":
+                if char == "{" and self.stack and self.stack[-1] == "[" and self.object_start is None:
+                    self.object_start = self.position
+                self.stack.append(char)
+            elif char in "}]":
+                expected = "{" if char == "}" else "["
+                if not self.stack or self.stack[-1] != expected:
+                    # Unbalanced text (usually prose), start over from here
+                    self.stack = []
+                    self.object_start = None
+                else:
+                    self.stack.pop()
+                    if char == "}" and self.object_start is not None and self.stack and self.stack[-1] == "[":
+                        question = self._decode(self.buffer[self.object_start:self.position + 1])
+                        if question is not None:
+                            completed.append(question)
+                        self.object_start = None
+
+            self.position += 1
+
+        return completed
+
+    def _decode(self, text):
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        if isinstance(item, dict) and any(field in item for field in QUESTION_FIELDS):
+            return item
+        return None
+
+
+def validate_question(question):
+    """Check a question against the schema. Returns a list of problems (empty if valid)."""
+    problems = []
+
+    question_text = question.get('question_text')
+    if not isinstance(question_text, str) or not question_text.strip():
+        problems.append("missing question_text")
+
+    options = question.get('options')
+    if not isinstance(options, dict):
+        problems.append("missing options")
+    else:
+        for key in OPTION_KEYS:
+            value = options.get(key)
+            if not isinstance(value, str) or not value.strip():
+                problems.append(f"missing option {key}")
+
+    if question.get('correct_answer') not in OPTION_KEYS:
+        problems.append(f"invalid correct_answer {question.get('correct_answer')!r}")
+
+    if question.get('difficulty', 'Medium') not in DIFFICULTY_LEVELS:
+        problems.append(f"invalid difficulty {question.get('difficulty')!r}")
+
+    return problems
+
+
+def _option_letter(value):
+    """Letter for labels like "b", "(B)", "Option B", "B." or "2", or None"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        return None
+    match = _LETTER_PATTERN.fullmatch(value.strip())
+    if not match:
+        return None
+    letter = match.group(1).upper()
+    return OPTION_KEYS[int(letter) - 1] if letter.isdigit() else letter
+
+
+def _matching_options(text, options):
+    """Keys of the options whose text equals text, ignoring case and surrounding space"""
+    text = text.strip().lower()
+    return [key for key, option in options.items() if isinstance(option, str) and option.strip().lower() == text]
+
+
+def normalize_answer(value, options):
+    """Map an answer given as a label, the option text or both ("C) 4") to a letter.
+
+    The option text is matched first, so "4" picks the option reading "4".
+    Returns None if the answer cannot be mapped or is ambiguous, e.g. "4"
+    when option C reads "4" but "4" could also mean the fourth option, D.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        return None
+
+    letter = _option_letter(value)
+    matches = _matching_options(value, options)
+    if matches:
+        if len(matches) > 1 or (letter and letter != matches[0]):
+            return None
+        return matches[0]
+    if letter:
+        return letter
+
+    labelled = _LABELLED_PATTERN.fullmatch(value.strip())
+    if labelled:
+        letter = labelled.group(1).upper()
+        if _matching_options(labelled.group(2), options) == [letter]:
+            return letter
+    return None
+
+
+def normalize_difficulty(value):
+    """Map a difficulty label to one of DIFFICULTY_LEVELS, or None"""
+    if not isinstance(value, str):
+        return None
+    return DIFFICULTY_ALIASES.get(value.strip().lower())
+
+
+def _closest_topic(question_text, topics):
+    """Selected topic sharing the most words with the question, defaulting to the first"""
+    words = set(re.findall(r"\w+", question_text.lower()))
+    return max(topics, key=lambda topic: len(words & set(re.findall(r"\w+", topic.lower()))))
+
+
+def repair_question(question, topics=(), level=None):
+    """Return a repaired copy of a question, or the question itself if nothing needed fixing.
+
+    Fixes list or lower-case option keys, answer letters in other formats,
+    difficulty synonyms, and a missing topic or difficulty (taken from the
+    topics and level the question was requested for). Problems that cannot
+    be fixed are left for validate_question() to report.
+    """
+    repaired = dict(question)
+
+    options = repaired.get('options')
+    if isinstance(options, list) and len(options) == len(OPTION_KEYS):
+        options = dict(zip(OPTION_KEYS, options))
+    if isinstance(options, dict):
+        options = {
+            _option_letter(key) or key: str(value).strip() if isinstance(value, (str, int, float)) else value
+            for key, value in options.items()
+        }
+        repaired['options'] = options
+    else:
+        options = {}
+
+    if repaired.get('correct_answer') not in OPTION_KEYS:
+        answer = normalize_answer(repaired.get('correct_answer'), options)
+        if answer:
+            repaired['correct_answer'] = answer
+
+    if isinstance(repaired.get('question_text'), str):
+        repaired['question_text'] = repaired['question_text'].strip()
+
+    difficulty = repaired.get('difficulty')
+    if difficulty not in DIFFICULTY_LEVELS:
+        if difficulty is None or (isinstance(difficulty, str) and not difficulty.strip()):
+            difficulty = level if level in DIFFICULTY_LEVELS else None
+        else:
+            difficulty = normalize_difficulty(difficulty)
+        if difficulty:
+            repaired['difficulty'] = difficulty
+
+    if not repaired.get('topic') and topics:
+        repaired['topic'] = _closest_topic(str(repaired.get('question_text', '')), topics)
+
+    return question if repaired == question else repaired
+
+
+def find_missing_numbers(questions, expected_count):
+    """Return the 1-based question numbers in 1..expected_count that were not recovered"""
+    numbers = [question.get('question_number') for question in questions]
+    numbered = all(isinstance(number, int) for number in numbers) and len(set(numbers)) == len(numbers)
+    if not numbered:
+        # Unreliable numbering, assume the recovered questions came first
+        numbers = range(1, len(questions) + 1)
+    return sorted(set(range(1, expected_count + 1)) - set(numbers))
+
+
+def repair_questions(questions, topics=(), level=None):
+    """Repair and validate a batch. Returns (valid questions, [(question, problems), ...], repaired count)."""
+    valid = []
+    rejected = []
+    repaired_count = 0
+    for question in questions:
+        repaired = repair_question(question, topics, level)
+        problems = validate_question(repaired)
+        if problems:
+            rejected.append((question, problems))
+        else:
+            valid.append(repaired)
+            repaired_count += repaired is not question
+    return valid, rejected, repaired_count
+
+
+def parse_questions(response_text, expected_count=None, topics=(), level=None):
+    """Recover, repair and validate every complete question in a response.
+
+    Works on fenced, prose-wrapped and truncated output in a single pass.
+    topics and level are what the questions were requested for, used to fill
+    in a missing topic or difficulty. When expected_count is given, the
+    numbers of questions that are absent or could not be repaired are
+    reported in the result's missing list.
+    """
+    parser = IncrementalQuestionParser()
+    questions, rejected, repaired = repair_questions(parser.feed(response_text or ""), topics, level)
+    missing = find_missing_numbers(questions, expected_count) if expected_count else []
+    return ParseResult(questions, rejected, missing, repaired)
@@ -0,0 +1,268 @@
+"""Lightweight in-process instrumentation: counters and histograms.
+
+Metrics are declared once below and updated from the code paths they
+describe:
+
+    with metrics.STAGE_SECONDS.time(stage="dedup"):
+        ...
+    metrics.LLM_RETRIES.inc(model=model)
+
+Everything is off unless MCQ_METRICS is set (or enable() is called). While
+disabled, every update returns after a single flag check, so the calls can
+stay in hot paths. Collected values are exported as Prometheus text or JSON,
+optionally over HTTP (MCQ_METRICS_PORT).
+"""
+import bisect
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from itertools import accumulate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_ENABLED
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000)
+
+_enabled = METRICS_ENABLED
+_NULL_TIMER = nullcontext()
+_registry = []
+
+
+def enable(on=True):
+    """Turn collection on or off for the whole process"""
+    global _enabled
+    _enabled = on
+
+
+def is_enabled():
+    """Whether metrics are being collected"""
+    return _enabled
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    escaped = ((name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    """A monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        if not _enabled:
+            return
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.values.clear()
+
+    def samples(self):
+        with self.lock:
+            return [{"labels": dict(key), "value": value} for key, value in self.values.items()]
+
+    def prometheus_lines(self):
+        with self.lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in self.values.items()]
+
+
+class Histogram:
+    """Bucketed distribution (count, sum and bucket counts) per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.values = {}  # label key -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        if not _enabled:
+            return
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [0] * (len(self.buckets) + 2)
+            entry[index] += 1
+            entry[-1] += value
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent inside it"""
+        if not _enabled:
+            return _NULL_TIMER
+        return self._timer(labels)
+
+    @contextmanager
+    def _timer(self, labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def reset(self):
+        with self.lock:
+            self.values.clear()
+
+    def samples(self):
+        with self.lock:
+            entries = [(dict(key), list(entry)) for key, entry in self.values.items()]
+        samples = []
+        for labels, entry in entries:
+            count = sum(entry[:-1])
+            samples.append({
+                "labels": labels,
+                "count": count,
+                "sum": entry[-1],
+                "buckets": dict(zip([*map(str, self.buckets), "+Inf"], accumulate(entry[:-1])))
+            })
+        return samples
+
+    def prometheus_lines(self):
+        lines = []
+        for sample in self.samples():
+            key = _label_key(sample["labels"])
+            for bound, count in sample["buckets"].items():
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {sample['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {sample['count']}")
+        return lines
+
+
+def timed(histogram, **labels):
+    """Decorator observing a function's run time in histogram"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with histogram.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_usage(model, usage):
+    """Count the tokens reported in a completion's response.usage"""
+    if not _enabled or usage is None:
+        return
+    LLM_TOKENS.inc(usage.prompt_tokens or 0, model=model, kind="prompt")
+    LLM_TOKENS.inc(usage.completion_tokens or 0, model=model, kind="completion")
+    LLM_COMPLETION_TOKENS.observe(usage.completion_tokens or 0, model=model)
+
+
+def quantile(sample, q):
+    """Estimate a quantile of a histogram sample (the upper bound of its bucket)"""
+    if not sample["count"]:
+        return None
+    target = q * sample["count"]
+    for bound, count in sample["buckets"].items():
+        if count >= target:
+            return float(bound)
+    return float("inf")
+
+
+def snapshot():
+    """All metrics as a JSON-serializable dict"""
+    return {
+        metric.name: {"type": metric.kind, "help": metric.help, "samples": metric.samples()}
+        for metric in _registry
+    }
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.prometheus_lines())
+    return "\n".join(lines) + "\n"
+
+
+def render_json():
+    return json.dumps(snapshot(), indent=2)
+
+
+def reset():
+    """Clear every collected value"""
+    for metric in _registry:
+        metric.reset()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves /metrics (Prometheus text) and /metrics.json"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body, content_type = render_prometheus(), "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body, content_type = render_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serve the metrics endpoints from a background thread (once per process).
+
+    Raises OSError if the port cannot be bound.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
+
+
+# Metric catalogue
+STAGE_SECONDS = Histogram("mcq_stage_seconds", "Seconds spent in each generation and publishing stage")
+LLM_REQUEST_SECONDS = Histogram("mcq_llm_request_seconds", "Latency of AI completion requests")
+LLM_REQUESTS = Counter("mcq_llm_requests_total", "AI completion requests by outcome")
+LLM_RETRIES = Counter("mcq_llm_retries_total", "AI completion attempts retried after a failure")
+LLM_TOKENS = Counter("mcq_llm_tokens_total", "Tokens reported in response.usage")
+LLM_COMPLETION_TOKENS = Histogram("mcq_llm_completion_tokens", "Completion tokens per AI request", TOKEN_BUCKETS)
+LLM_CACHE_LOOKUPS = Counter("mcq_llm_cache_lookups_total", "Response cache lookups by result")
+GITHUB_REQUEST_SECONDS = Histogram("mcq_github_request_seconds", "Latency of GitHub API calls")
+GITHUB_REQUESTS = Counter("mcq_github_requests_total", "GitHub API calls by status code")
@@ -0,0 +1,148 @@
+"""Deterministic OpenAI-compatible mock server for offline runs and load tests.
+
+Answers POST /v1/chat/completions (streaming and non-streaming) with valid
+MCQ JSON. The same prompt always produces the same questions, so runs are
+reproducible. Start it with:
+
+    python mock_llm_server.py --port 8765
+
+and run the app with MCQ_LLM_BACKEND=mock.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LETTERS = ["A", "B", "C", "D"]
+
+
+def build_questions(prompt):
+    """Build the deterministic question list for a prompt"""
+    match = re.search(r"Generate (?:exactly )?(\d+)", prompt)
+    num_questions = int(match.group(1)) if match else 5
+    topics = re.findall(r"^- ([^:\n]+):", prompt, re.MULTILINE) or ["General"]
+    level_match = re.search(r"DIFFICULTY: (\w+)", prompt)
+    level = level_match.group(1) if level_match else "Medium"
+
+    seed = int(hashlib.sha256(prompt.encode()).hexdigest()[:16], 16)
+    rng = random.Random(seed)
+    questions = []
+    for i in range(num_questions):
+        topic = topics[i % len(topics)]
+        a, b = rng.randint(2, 99), rng.randint(2, 99)
+        answer = a + b
+        values = [answer, answer + 1, answer - 1, answer + 10]
+        rng.shuffle(values)
+        questions.append({
+            "question_number": i + 1,
+            "question_text": f"[{topic}] Mock question {seed % 10000}-{i + 1}: what is {a} + {b}?",
+            "options": dict(zip(LETTERS, (str(value) for value in values))),
+            "correct_answer": LETTERS[values.index(answer)],
+            "explanation": f"{a} + {b} = {answer}",
+            "topic": topic,
+            "subtopic": "Mock",
+            "difficulty": level if level in ("Easy", "Medium", "Hard") else rng.choice(["Easy", "Medium", "Hard"])
+        })
+    return questions
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    latency = 0.0  # Seconds added before each response
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-mcq", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        content = json.dumps({"questions": build_questions(prompt)})
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4
+        }
+        base = {
+            "id": "chatcmpl-mock",
+            "created": int(time.time()),
+            "model": request.get("model", "mock-mcq")
+        }
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if request.get("stream"):
+            self._stream(base, content, usage)
+            return
+
+        self._send_json(200, dict(base, object="chat.completion", usage=usage, choices=[{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }]))
+
+    def _stream(self, base, content, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        def send(event):
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+
+        for start in range(0, len(content), 40):
+            send(dict(base, object="chat.completion.chunk", choices=[{
+                "index": 0,
+                "delta": {"content": content[start:start + 40]},
+                "finish_reason": None
+            }]))
+        send(dict(base, object="chat.completion.chunk", usage=usage, choices=[{
+            "index": 0, "delta": {}, "finish_reason": "stop"
+        }]))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def create_server(host="127.0.0.1", port=8765, latency=0.0):
+    """Create (but do not start) a mock server"""
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {"latency": latency})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.latency)
+    print(f"Mock LLM server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import json
+import math
+import os
+import tempfile
+import threading
+
+from config import DATA_DIR
+
+# Token budget settings
+HISTORY_PATH = os.path.join(DATA_DIR, "token_history.json")
+MAX_OUTPUT_TOKENS = 4000           # Largest max_tokens sent in one request
+DEFAULT_TOKENS_PER_QUESTION = 300  # Used until a subject/difficulty has history
+RESPONSE_OVERHEAD_TOKENS = 50      # JSON wrapper around the question list
+SAFETY_MARGIN = 1.25               # Headroom over the estimate to avoid truncation
+HISTORY_WEIGHT = 0.2               # Weight of the newest sample in the running average
+CHARS_PER_TOKEN = 4                # Rough size of a token when usage is not reported
+
+
+def estimate_tokens(text):
+    """Rough token count for text when the API does not report usage"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class PromptPlanner:
+    """Sizes max_tokens and request splits from observed output tokens per question.
+
+    Keeps an exponentially weighted average of completion tokens per
+    question for each subject and difficulty, persisted to a small JSON file.
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.history = json.load(f)
+        except (OSError, ValueError):
+            self.history = {}
+
+    def tokens_per_question(self, subject, level):
+        """Estimated completion tokens for one question"""
+        with self.lock:
+            entry = self.history.get(f"{subject}|{level}") or self.history.get(f"{subject}|Mix")
+        return entry["average"] if entry else DEFAULT_TOKENS_PER_QUESTION
+
+    def max_tokens(self, subject, level, num_questions):
+        """max_tokens to request for num_questions questions"""
+        estimate = num_questions * self.tokens_per_question(subject, level) * SAFETY_MARGIN
+        return min(MAX_OUTPUT_TOKENS, math.ceil(estimate + RESPONSE_OVERHEAD_TOKENS))
+
+    def questions_per_request(self, subject, level):
+        """Largest number of questions that fits in one request's output budget"""
+        per_question = self.tokens_per_question(subject, level) * SAFETY_MARGIN
+        return max(1, int((MAX_OUTPUT_TOKENS - RESPONSE_OVERHEAD_TOKENS) // per_question))
+
+    def record_usage(self, subject, level, completion_tokens, num_questions):
+        """Fold an observed response into the running average"""
+        if not completion_tokens or num_questions <= 0:
+            return
+        sample = completion_tokens / num_questions
+        key = f"{subject}|{level}"
+        with self.lock:
+            entry = self.history.get(key)
+            if entry:
+                entry["average"] += HISTORY_WEIGHT * (sample - entry["average"])
+                entry["samples"] += 1
+            else:
+                self.history[key] = {"average": sample, "samples": 1}
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.history, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+_planner = None
+_planner_lock = threading.Lock()
+
+
+def get_planner():
+    """Return the process-wide prompt planner"""
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            _planner = PromptPlanner()
+        return _planner
@@ -0,0 +1,240 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+from config import DATA_DIR
+from github_publisher import GitHubError
+from sqlite_store import connect, create_database
+
+# Outbox settings
+OUTBOX_PATH = os.path.join(DATA_DIR, "publish_outbox.db")
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 2       # Seconds before the first retry
+BACKOFF_MAX = 15 * 60  # Longest wait between attempts
+IDLE_POLL_SECONDS = 30
+HOLD_SECONDS = 60               # A held job runs after this long even if never released (e.g. after a crash)
+IN_FLIGHT_TIMEOUT = 10 * 60     # An upload claimed this long ago is assumed to have died with its process
+
+# Replica backends that upload with the publishing teacher's token
+TOKEN_BACKENDS = ("github",)
+
+# GitHub responses worth retrying: conflicts, rate limits and server errors
+RETRYABLE_STATUS = {409, 429, 500, 502, 503, 504}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    test_id TEXT PRIMARY KEY,
+    backend TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+class TestIdTaken(Exception):
+    """Raised when a test ID is already reserved in the outbox"""
+
+
+def retry_delay(error, attempts):
+    """Seconds to wait before retrying, or None if the error is permanent"""
+    if isinstance(error, GitHubError):
+        headers = error.response.headers
+        rate_limited = (
+            "Retry-After" in headers
+            or headers.get("X-RateLimit-Remaining") == "0"
+            or "rate limit" in error.response.text.lower()
+        )
+        if error.status_code not in RETRYABLE_STATUS and not (error.status_code == 403 and rate_limited):
+            return None
+        retry_after = headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset", "").isdigit():
+            return max(0, int(headers["X-RateLimit-Reset"]) - time.time())
+    elif not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return None
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempts - 1)))
+
+
+class PublishOutbox:
+    """Durable queue of tests waiting to be copied to a remote backend.
+
+    Jobs live in SQLite so they survive restarts. A background worker
+    drains due jobs, retrying failures with exponential backoff and
+    honouring Retry-After. Credentials are only held in memory, so a job
+    that needs a token is only claimed by the process that queued it, or
+    by one with a default token.
+    """
+
+    def __init__(self, backend_factory, path=OUTBOX_PATH, default_token=None):
+        self.backend_factory = backend_factory
+        self.path = path
+        self.default_token = default_token
+        self.tokens = {}
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        create_database(path, SCHEMA)
+        self._recover_stale_jobs()
+
+    def _connect(self):
+        return connect(self.path, row_factory=sqlite3.Row)
+
+    def _recover_stale_jobs(self):
+        """Return uploads whose worker died mid-flight to the queue"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = 'pending' WHERE status = 'in_flight' AND updated_at <= ?",
+                (time.time() - IN_FLIGHT_TIMEOUT,)
+            )
+
+    def enqueue(self, test_id, backend, test_data, token=None, hold=False):
+        """Reserve the test ID and queue the test for upload.
+
+        A held job is not uploaded until release() is called, so the caller
+        can finish its own write first and cancel() the job if that fails.
+        """
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO outbox (test_id, backend, payload, status, next_attempt_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                    (test_id, backend, json.dumps(test_data), now + HOLD_SECONDS if hold else now, now, now)
+                )
+        except sqlite3.IntegrityError:
+            raise TestIdTaken(test_id)
+
+        with self.lock:
+            if token:
+                self.tokens[test_id] = token
+        self.start()
+        if not hold:
+            self.wakeup.set()
+
+    def release(self, test_id):
+        """Let a held job run now"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET next_attempt_at = ? WHERE test_id = ? AND status = 'pending' AND attempts = 0",
+                (time.time(), test_id)
+            )
+        self.wakeup.set()
+
+    def cancel(self, test_id):
+        """Drop a job that has not been attempted yet, freeing its test ID"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM outbox WHERE test_id = ? AND status = 'pending' AND attempts = 0", (test_id,))
+        with self.lock:
+            self.tokens.pop(test_id, None)
+
+    def get_status(self, test_id):
+        """Return the job row as a dict, or None if the test was never queued"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT status, attempts, next_attempt_at, last_error FROM outbox WHERE test_id = ?",
+                (test_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def start(self):
+        """Start the background worker if it is not running"""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="publish-outbox", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wakeup.clear()
+            self._recover_stale_jobs()
+            while self.process_next():
+                pass
+            self.wakeup.wait(self._seconds_until_next_job())
+
+    def _claimable(self):
+        """SQL condition and parameters for the jobs this process can upload"""
+        if self.default_token:
+            return "", []
+        with self.lock:
+            held = list(self.tokens)
+        condition = f"AND (backend NOT IN ({', '.join('?' * len(TOKEN_BACKENDS))})"
+        if held:
+            condition += f" OR test_id IN ({', '.join('?' * len(held))})"
+        return condition + ")", [*TOKEN_BACKENDS, *held]
+
+    def _seconds_until_next_job(self):
+        condition, params = self._claimable()
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending' {condition}", params
+            ).fetchone()
+        if row[0] is None:
+            return IDLE_POLL_SECONDS
+        return min(IDLE_POLL_SECONDS, max(0.0, row[0] - time.time()))
+
+    def process_next(self):
+        """Upload one due job. Returns False when no job is due."""
+        now = time.time()
+        condition, params = self._claimable()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT test_id, backend, payload, attempts FROM outbox "
+                f"WHERE status = 'pending' AND next_attempt_at <= ? {condition} ORDER BY next_attempt_at LIMIT 1",
+                (now, *params)
+            ).fetchone()
+            if row is None:
+                return False
+            claimed = conn.execute(
+                "UPDATE outbox SET status = 'in_flight', updated_at = ? WHERE test_id = ? AND status = 'pending'",
+                (now, row['test_id'])
+            ).rowcount
+            if not claimed:
+                return True  # Another worker took it
+
+        test_id = row['test_id']
+        attempts = row['attempts'] + 1
+        with self.lock:
+            token = self.tokens.get(test_id) or self.default_token
+
+        try:
+            backend = self.backend_factory(row['backend'], token)
+            backend.save(test_id, json.loads(row['payload']))
+        except Exception as e:
+            delay = retry_delay(e, attempts)
+            if delay is None or attempts >= MAX_ATTEMPTS:
+                self._finish(test_id, "failed", attempts, str(e))
+            else:
+                self._retry_later(test_id, attempts, delay, str(e))
+            return True
+
+        self._finish(test_id, "done", attempts, None)
+        return True
+
+    def _retry_later(self, test_id, attempts, delay, error):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, "
+                "last_error = ?, updated_at = ? WHERE test_id = ?",
+                (attempts, now + delay, error, now, test_id)
+            )
+
+    def _finish(self, test_id, status, attempts, error):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, updated_at = ? WHERE test_id = ?",
+                (status, attempts, error, time.time(), test_id)
+            )
+        with self.lock:
+            self.tokens.pop(test_id, None)
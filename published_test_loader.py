@@ -0,0 +1,169 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from config import DATA_DIR, TEST_ENCODING
+from github_publisher import GitHubError, GitHubPublisher, test_file_path
+from serialization import decode_test
+
+# Read-through cache settings for loading published tests
+TEST_CACHE_DIR = os.path.join(DATA_DIR, "test_cache")
+MEMORY_CACHE_ENTRIES = 256
+REVALIDATE_SECONDS = 30  # Serve a cached test this long before checking GitHub for changes
+
+TEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class _Flight:
+    """One in-progress upstream fetch that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class PublishedTestLoader:
+    """Loads published tests by ID through an in-memory LRU and an on-disk cache.
+
+    Cached tests are revalidated against GitHub with If-None-Match at most
+    every REVALIDATE_SECONDS, so unchanged tests cost a 304 instead of a
+    download. Concurrent requests for the same uncached test share a single
+    upstream fetch. If GitHub cannot be reached, the last cached copy is
+    served.
+    """
+
+    def __init__(self, publisher, cache_dir=TEST_CACHE_DIR, max_entries=MEMORY_CACHE_ENTRIES,
+                 revalidate_seconds=REVALIDATE_SECONDS, encoding=TEST_ENCODING):
+        self.publisher = publisher
+        self.encoding = encoding
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.revalidate_seconds = revalidate_seconds
+        self.memory = OrderedDict()  # test_id -> {"data", "etag", "checked_at"}
+        self.flights = {}
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def load(self, test_id):
+        """Return the test data, or None if no such test is published"""
+        if not TEST_ID_PATTERN.match(test_id or ""):
+            return None
+
+        with self.lock:
+            entry = self.memory.get(test_id)
+            if entry and time.monotonic() - entry["checked_at"] < self.revalidate_seconds:
+                self.memory.move_to_end(test_id)
+                return entry["data"]
+
+            flight = self.flights.get(test_id)
+            leader = flight is None
+            if leader:
+                flight = self.flights[test_id] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._revalidate(test_id, entry)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[test_id]
+            flight.done.set()
+        return flight.result
+
+    def _revalidate(self, test_id, entry):
+        if entry is None:
+            entry = self._read_disk(test_id)
+
+        try:
+            content, etag = self._fetch(test_id, entry["etag"] if entry else None)
+        except GitHubError as e:
+            if e.status_code == 404:
+                self._forget(test_id)
+                return None
+            if entry:
+                return entry["data"]  # Serve the stale copy while GitHub is failing
+            raise
+        except Exception:
+            if entry:
+                return entry["data"]
+            raise
+
+        if content is not None:
+            entry = {"data": decode_test(content), "etag": etag}
+            self._write_disk(test_id, entry)
+        entry = dict(entry, checked_at=time.monotonic())
+
+        with self.lock:
+            self.memory[test_id] = entry
+            self.memory.move_to_end(test_id)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+        return entry["data"]
+
+    def _fetch(self, test_id, etag):
+        try:
+            return self.publisher.fetch_file(test_file_path(test_id, self.encoding), etag)
+        except GitHubError as e:
+            # Tests published before the encoding was changed are still plain JSON
+            if e.status_code != 404 or self.encoding == "json":
+                raise
+        return self.publisher.fetch_file(test_file_path(test_id, "json"), etag)
+
+    def _path(self, test_id):
+        return os.path.join(self.cache_dir, f"{test_id}.json")
+
+    def _read_disk(self, test_id):
+        try:
+            with open(self._path(test_id), encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return {"data": cached["data"], "etag": cached.get("etag")}
+
+    def _write_disk(self, test_id, entry):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"etag": entry["etag"], "data": entry["data"]}, f)
+            os.replace(tmp_path, self._path(test_id))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _forget(self, test_id):
+        with self.lock:
+            self.memory.pop(test_id, None)
+        try:
+            os.remove(self._path(test_id))
+        except OSError:
+            pass
+
+
+_loader = None
+_loader_lock = threading.Lock()
+
+
+def get_test_loader():
+    """Return the process-wide test loader (uses $MCQ_GITHUB_TOKEN if set)"""
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = PublishedTestLoader(GitHubPublisher(os.environ.get("MCQ_GITHUB_TOKEN")))
+        return _loader
+
+
+def load_test(test_id):
+    """Load a published test by ID, or None if it does not exist"""
+    return get_test_loader().load(test_id)
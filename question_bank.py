@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from config import DATA_DIR
+from sqlite_store import connect, create_database
+
+# Question bank location
+BANK_PATH = os.path.join(DATA_DIR, "question_bank.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL UNIQUE,
+    subject TEXT NOT NULL,
+    topic TEXT,
+    subtopic TEXT,
+    difficulty TEXT,
+    question_text TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    times_used INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_questions_lookup ON questions (subject, topic, difficulty);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    question_text, topic, subtopic, content='questions', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts (rowid, question_text, topic, subtopic)
+    VALUES (new.id, new.question_text, new.topic, new.subtopic);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, question_text, topic, subtopic)
+    VALUES ('delete', old.id, old.question_text, old.topic, old.subtopic);
+END;
+"""
+
+
+def question_fingerprint(question):
+    """Stable hash of a question's text and options"""
+    options = question.get('options') or {}
+    parts = [question.get('question_text', '')] + [str(options.get(letter, '')) for letter in "ABCD"]
+    normalized = "\n".join(" ".join(str(part).lower().split()) for part in parts)
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def _fts_query(text):
+    """Turn free text into a safe FTS5 query matching any of its words"""
+    words = re.findall(r"\w{3,}", text or "")
+    return " OR ".join(f'"{word}"' for word in words)
+
+
+class QuestionBank:
+    """SQLite store of every generated question, searchable by syllabus fields and text"""
+
+    def __init__(self, path=BANK_PATH):
+        self.path = path
+        create_database(path, SCHEMA)
+
+    def _connect(self):
+        return connect(self.path, row_factory=sqlite3.Row)
+
+    def add_questions(self, subject, questions):
+        """Store questions, skipping ones already in the bank. Returns the number added."""
+        rows = []
+        now = time.time()
+        for question in questions:
+            if not question.get('question_text'):
+                continue
+            rows.append((
+                question_fingerprint(question),
+                subject,
+                question.get('topic', ''),
+                question.get('subtopic', ''),
+                question.get('difficulty', ''),
+                question['question_text'],
+                json.dumps(question),
+                now
+            ))
+
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO questions "
+                "(fingerprint, subject, topic, subtopic, difficulty, question_text, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return conn.total_changes - before
+
+    def find_questions(self, subject, topics, level, limit, query=None, exclude=()):
+        """Return up to limit stored questions matching the test configuration.
+
+        Least-used questions are preferred so repeated tests do not keep
+        serving the same items. When query text is given, only questions
+        whose text, topic or subtopic match one of its words are returned.
+        """
+        if limit <= 0:
+            return []
+
+        sql = "SELECT q.id, q.fingerprint, q.payload FROM questions q"
+        conditions = ["q.subject = ?"]
+        params = [subject]
+
+        fts_query = _fts_query(query)
+        if query and not fts_query:
+            return []
+        if fts_query:
+            sql += " JOIN questions_fts f ON f.rowid = q.id"
+            conditions.append("questions_fts MATCH ?")
+            params.append(fts_query)
+        if topics:
+            conditions.append(f"q.topic IN ({', '.join('?' for _ in topics)})")
+            params.extend(topics)
+        if level != "Mix":
+            conditions.append("q.difficulty = ?")
+            params.append(level)
+        if exclude:
+            conditions.append(f"q.fingerprint NOT IN ({', '.join('?' for _ in exclude)})")
+            params.extend(exclude)
+
+        sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY q.times_used, RANDOM() LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+            conn.executemany(
+                "UPDATE questions SET times_used = times_used + 1 WHERE id = ?",
+                [(row['id'],) for row in rows]
+            )
+
+        return [json.loads(row['payload']) for row in rows]
+
+    def count(self, subject=None):
+        """Number of stored questions, optionally for one subject"""
+        with self._connect() as conn:
+            if subject:
+                return conn.execute("SELECT COUNT(*) FROM questions WHERE subject = ?", (subject,)).fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    """Return the process-wide question bank"""
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            _bank = QuestionBank()
+        return _bank
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from config import DATA_DIR
+
+# Cache settings
+CACHE_DIR = os.path.join(DATA_DIR, "response_cache")
+CACHE_MAX_ENTRIES = 500
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def make_cache_key(prompt, model, temperature):
+    """Hash the prompt together with the generation settings"""
+    payload = json.dumps([prompt, model, temperature])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class QuestionCache:
+    """On-disk cache of raw LLM responses keyed by a hash of the prompt.
+
+    Entries are single JSON files written atomically, so several Streamlit
+    sessions (and processes) can share one directory. A file's mtime records
+    its last use and drives LRU eviction; entries older than the TTL are
+    treated as missing.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_entries=CACHE_MAX_ENTRIES,
+                 max_bytes=CACHE_MAX_BYTES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached response text, or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return entry.get("response")
+
+    def put(self, key, response_text):
+        """Store a response and evict old entries if the cache is over its limits"""
+        entry = {"created_at": time.time(), "response": response_text}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            self._remove(tmp_path)
+            return
+
+        with self.lock:
+            self._evict()
+
+    def delete(self, key):
+        """Drop an entry, e.g. one whose questions are no longer usable"""
+        self._remove(self._path(key))
+
+    def _evict(self):
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for mtime, size, path in entries:
+            expired = now - mtime > self.ttl_seconds
+            if not expired and count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+            count -= 1
+            total_bytes -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide response cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = QuestionCache()
+        return _cache
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from config import DATA_DIR
+from question_bank import question_fingerprint
+from sqlite_store import connect, create_database
+
+# Near-duplicate detection settings
+INDEX_PATH = os.path.join(DATA_DIR, "published_index.db")
+SHINGLE_SIZE = 5             # Characters per shingle
+NUM_PERMUTATIONS = 64        # MinHash signature length
+LSH_BANDS = 16               # Bands of NUM_PERMUTATIONS // LSH_BANDS rows each
+SIMILARITY_THRESHOLD = 0.7   # Estimated Jaccard similarity treated as a duplicate
+
+# Fixed seed: stored signatures are only comparable if the permutations never change
+_PRIME = 4294967291  # Largest prime below 2**32
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, _PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _rng.randint(0, _PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+_ROWS_PER_BAND = NUM_PERMUTATIONS // LSH_BANDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    fingerprint TEXT PRIMARY KEY,
+    subject TEXT NOT NULL,
+    question_text TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_buckets ON buckets (bucket);
+"""
+
+
+def question_signature(question):
+    """MinHash signature of a question's text and options (option order is ignored)"""
+    options = question.get('options') or {}
+    parts = [question.get('question_text', '')] + sorted(str(option) for option in options.values())
+    text = " ".join(re.findall(r"\w+", " ".join(str(part) for part in parts).lower()))
+    if len(text) < SHINGLE_SIZE:
+        text = text.ljust(SHINGLE_SIZE)
+
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode()) % _PRIME for s in shingles), dtype=np.uint64, count=len(shingles))
+    # (a * x + b) mod p for every permutation and shingle, then the minimum per permutation
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def estimate_similarity(signature, signatures):
+    """Estimated Jaccard similarity between one signature and each row of signatures"""
+    return (signatures == signature).mean(axis=1)
+
+
+def _band_buckets(signature):
+    """One LSH bucket per band, hashed together with the band number"""
+    buckets = []
+    for band in range(LSH_BANDS):
+        chunk = bytes([band]) + signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND].tobytes()
+        buckets.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "big", signed=True))
+    return buckets
+
+
+class PublishedQuestionIndex:
+    """LSH index of MinHash signatures for every published question.
+
+    Candidates are looked up by band bucket, so a check only compares
+    against the few stored questions sharing a bucket instead of the
+    whole corpus.
+    """
+
+    def __init__(self, path=INDEX_PATH, threshold=SIMILARITY_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        create_database(path, SCHEMA)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def add_questions(self, subject, questions):
+        """Index published questions, skipping ones already indexed"""
+        now = time.time()
+        with self._connect() as conn:
+            for question in questions:
+                fingerprint = question_fingerprint(question)
+                signature = question_signature(question)
+                added = conn.execute(
+                    "INSERT OR IGNORE INTO signatures (fingerprint, subject, question_text, signature, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (fingerprint, subject, question.get('question_text', ''), signature.tobytes(), now)
+                ).rowcount
+                if added:
+                    conn.executemany(
+                        "INSERT INTO buckets (bucket, fingerprint) VALUES (?, ?)",
+                        [(bucket, fingerprint) for bucket in _band_buckets(signature)]
+                    )
+
+    def find_similar(self, signature):
+        """Return (question_text, similarity) of the closest published match over the threshold, or None"""
+        buckets = _band_buckets(signature)
+        placeholders = ", ".join("?" * len(buckets))
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT question_text, signature FROM signatures WHERE fingerprint IN ("
+                f"SELECT fingerprint FROM buckets WHERE bucket IN ({placeholders}))",
+                buckets
+            ).fetchall()
+        if not rows:
+            return None
+
+        candidates = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.uint32).reshape(len(rows), -1)
+        similarity = estimate_similarity(signature, candidates)
+        best = int(similarity.argmax())
+        if similarity[best] < self.threshold:
+            return None
+        return rows[best][0], float(similarity[best])
+
+
+    def has_similar(self, questions):
+        """True if any of questions nearly repeats a published question"""
+        return any(self.find_similar(question_signature(question)) for question in questions)
+
+
+class DuplicateFilter:
+    """Flags questions that nearly repeat the current test or a published question.
+
+    Questions that pass are remembered, so later questions in the same
+    test are compared against them too.
+    """
+
+    def __init__(self, existing_questions=(), index=None, threshold=SIMILARITY_THRESHOLD):
+        self.index = index
+        self.threshold = threshold
+        self.signatures = [question_signature(question) for question in existing_questions]
+
+    def check(self, question):
+        """Return a reason string if question is a near duplicate, otherwise remember it and return None"""
+        signature = question_signature(question)
+        if self.signatures:
+            similarity = estimate_similarity(signature, np.array(self.signatures))
+            if similarity.max() >= self.threshold:
+                return f"{similarity.max():.0%} similar to another question in this test"
+        if self.index is not None:
+            match = self.index.find_similar(signature)
+            if match:
+                text, similarity = match
+                return f"{similarity:.0%} similar to a published question: {text[:80]}"
+        self.signatures.append(signature)
+        return None
+
+
+def filter_near_duplicates(questions, existing_questions=(), index=None):
+    """Split questions into (kept, [(question, reason), ...] duplicates)"""
+    duplicate_filter = DuplicateFilter(existing_questions, index)
+    kept = []
+    duplicates = []
+    for question in questions:
+        reason = duplicate_filter.check(question)
+        if reason:
+            duplicates.append((question, reason))
+        else:
+            kept.append(question)
+    return kept, duplicates
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_published_index():
+    """Return the process-wide index of published questions"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PublishedQuestionIndex()
+        return _index
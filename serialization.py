@@ -0,0 +1,83 @@
+"""Versioned encoding of published test files.
+
+Tests are written as compact JSON by default, optionally compressed with
+gzip or zstd, or packed with msgpack (see TEST_ENCODING in config.py).
+decode_test() detects the format from the content, so every reader also
+accepts the pretty-printed JSON files written before versioning.
+"""
+import gzip
+import json
+
+from config import TEST_ENCODING
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Version written into every encoded test. Files without one are version 1
+# (the original pretty-printed JSON, which has the same fields).
+SCHEMA_VERSION = 2
+
+# Encoding name -> file extension
+ENCODINGS = {
+    "json": ".json",
+    "json.gz": ".json.gz",
+    "json.zst": ".json.zst",
+    "msgpack": ".msgpack"
+}
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _require(module, name, package):
+    if module is None:
+        raise ValueError(f"The {name} test encoding needs the '{package}' package (pip install {package})")
+    return module
+
+
+def encode_test(test_data, encoding=TEST_ENCODING):
+    """Serialize a test to bytes, tagged with the schema version"""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown test encoding: {encoding}")
+    data = dict(test_data, schema_version=SCHEMA_VERSION)
+
+    if encoding == "msgpack":
+        return _require(msgpack, "msgpack", "msgpack").packb(data, use_bin_type=True)
+
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if encoding == "json.gz":
+        # mtime=0 keeps the output identical for identical tests
+        return gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "json.zst":
+        return _require(zstandard, "zstd", "zstandard").ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return raw
+
+
+def decode_test(content):
+    """Read a test in any supported encoding, including legacy pretty-printed JSON"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+
+    if content.startswith(_GZIP_MAGIC):
+        content = gzip.decompress(content)
+    elif content.startswith(_ZSTD_MAGIC):
+        content = _require(zstandard, "zstd", "zstandard").ZstdDecompressor().decompress(content)
+
+    if content.lstrip()[:1] == b"{":
+        data = json.loads(content)
+    else:
+        data = _require(msgpack, "msgpack", "msgpack").unpackb(content, raw=False)
+
+    if data.get("schema_version", 1) > SCHEMA_VERSION:
+        raise ValueError(f"Test uses schema version {data['schema_version']}; this app supports up to {SCHEMA_VERSION}")
+    return data
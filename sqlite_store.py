@@ -0,0 +1,36 @@
+"""Connection handling shared by the app's SQLite stores"""
+import os
+import sqlite3
+from contextlib import contextmanager
+
+# Seconds to wait for another process's write lock before giving up
+BUSY_TIMEOUT = 30
+
+
+@contextmanager
+def connect(path, row_factory=None, isolation_level=""):
+    """Open a short-lived connection to path and close it afterwards.
+
+    A connection per call keeps the stores safe to use from any thread.
+    The block runs in a transaction that is committed on success and
+    rolled back on error, unless isolation_level is None, in which case
+    the caller manages transactions itself.
+    """
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=isolation_level)
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    try:
+        if isolation_level is None:
+            yield conn
+        else:
+            with conn:
+                yield conn
+    finally:
+        conn.close()
+
+
+def create_database(path, schema):
+    """Create the database's directory and tables. schema must be safe to re-run."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with connect(path) as conn:
+        conn.executescript(schema)
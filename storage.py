@@ -0,0 +1,206 @@
+import os
+import tempfile
+import threading
+import time
+
+from config import DATA_DIR, STORAGE_BACKEND, TEST_ENCODING
+from github_publisher import GitHubError, GitHubPublisher, test_file_path
+from publish_outbox import PublishOutbox
+from serialization import ENCODINGS, decode_test, encode_test
+from sqlite_store import connect, create_database
+
+# Backend locations
+LOCAL_STORAGE_DIR = os.path.join(DATA_DIR, "tests")
+SQLITE_STORAGE_PATH = os.path.join(DATA_DIR, "tests.db")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tests (
+    test_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class StorageBackend:
+    """Interface for places published tests can be stored"""
+
+    name = "base"
+
+    def save(self, test_id, test_data):
+        """Store a test, raising an exception on failure"""
+        raise NotImplementedError
+
+    def load(self, test_id):
+        """Return a stored test, or None if it does not exist"""
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    """One file per test in a local directory, in the configured test encoding"""
+
+    name = "local"
+
+    def __init__(self, directory=LOCAL_STORAGE_DIR, encoding=TEST_ENCODING):
+        self.directory = directory
+        self.encoding = encoding
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, test_id, encoding=None):
+        return os.path.join(self.directory, f"{test_id}{ENCODINGS[encoding or self.encoding]}")
+
+    def save(self, test_id, test_data):
+        content = encode_test(test_data, self.encoding)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, self._path(test_id))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self, test_id):
+        # Tests saved before the encoding was changed keep their old extension
+        for encoding in dict.fromkeys([self.encoding, *ENCODINGS]):
+            try:
+                with open(self._path(test_id, encoding), "rb") as f:
+                    return decode_test(f.read())
+            except FileNotFoundError:
+                continue
+        return None
+
+
+class SQLiteStorage(StorageBackend):
+    """Tests stored as rows in a SQLite database, in the configured test encoding"""
+
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_STORAGE_PATH, encoding=TEST_ENCODING):
+        self.path = path
+        self.encoding = encoding
+        create_database(path, SQLITE_SCHEMA)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def save(self, test_id, test_data):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tests (test_id, data, updated_at) VALUES (?, ?, ?)",
+                (test_id, encode_test(test_data, self.encoding), time.time())
+            )
+
+    def load(self, test_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM tests WHERE test_id = ?", (test_id,)).fetchone()
+        # Rows saved before tests were versioned hold plain JSON text
+        return decode_test(row[0]) if row else None
+
+
+class GitHubStorage(StorageBackend):
+    """Tests stored as files in the GitHub repository, in the configured test encoding"""
+
+    name = "github"
+
+    def __init__(self, token, encoding=TEST_ENCODING):
+        self.publisher = GitHubPublisher(token)
+        self.encoding = encoding
+
+    def save(self, test_id, test_data):
+        content = encode_test(test_data, self.encoding)
+        try:
+            self.publisher.put_file(test_file_path(test_id, self.encoding), content, f"Add test: {test_id}")
+        except GitHubError as e:
+            # A retried upload whose first attempt already landed is not an error
+            if e.status_code != 422 or self.load(test_id) != decode_test(content):
+                raise
+
+    def load(self, test_id):
+        content = self.publisher.get_file(test_file_path(test_id, self.encoding))
+        if content is None and self.encoding != "json":
+            content = self.publisher.get_file(test_file_path(test_id, "json"))
+        return decode_test(content) if content is not None else None
+
+
+class ReplicatedStorage(StorageBackend):
+    """Save to a fast primary backend and copy to a replica in the background.
+
+    The copy goes through the durable publish outbox, which also reserves
+    the test ID: saving an ID that is already queued raises TestIdTaken.
+    """
+
+    def __init__(self, primary, replica_name, token=None):
+        self.primary = primary
+        self.replica_name = replica_name
+        self.token = token
+        self.name = f"{primary.name}+{replica_name}"
+
+    def save(self, test_id, test_data):
+        outbox = get_outbox()
+        # Reserve the ID, but only upload once the primary copy is written
+        outbox.enqueue(test_id, self.replica_name, test_data, self.token, hold=True)
+        try:
+            self.primary.save(test_id, test_data)
+        except Exception:
+            outbox.cancel(test_id)
+            raise
+        outbox.release(test_id)
+
+    def load(self, test_id):
+        test_data = self.primary.load(test_id)
+        if test_data is None:
+            test_data = _create_backend(self.replica_name, self.token).load(test_id)
+        return test_data
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """Return the process-wide publish outbox, starting its worker on first use"""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = PublishOutbox(_create_backend, default_token=os.environ.get("MCQ_GITHUB_TOKEN"))
+            _outbox.start()
+        return _outbox
+
+
+def replication_status(test_id):
+    """Return "pending", "retrying ...", "done", "failed: ..." or None if the test was not replicated"""
+    job = get_outbox().get_status(test_id)
+    if job is None:
+        return None
+    if job['status'] == "failed":
+        return f"failed: {job['last_error']}"
+    if job['status'] == "done":
+        return "done"
+    if job['attempts']:
+        return f"retrying after {job['attempts']} failed attempt(s): {job['last_error']}"
+    return "pending"
+
+
+def _create_backend(name, token):
+    if name == "local":
+        return LocalStorage()
+    if name == "sqlite":
+        return SQLiteStorage()
+    if name == "github":
+        token = token or os.environ.get("MCQ_GITHUB_TOKEN")
+        if not token:
+            raise ValueError("No GitHub token available for upload; publish the test again")
+        return GitHubStorage(token)
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+def get_storage(token=None, backend=STORAGE_BACKEND):
+    """Create the storage backend selected in configuration"""
+    names = backend.split("+")
+    if len(names) == 1:
+        return _create_backend(names[0], token)
+    if len(names) == 2:
+        return ReplicatedStorage(_create_backend(names[0], token), names[1], token)
+    raise ValueError(f"Unsupported storage backend: {backend}")
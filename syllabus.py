@@ -1,166 +1,133 @@
-syllabus = {
-"Mathematics": {
-    "Integral Calculus": {
-      "description": "Includes definite and indefinite integrals, area under curves, integration by parts, substitution, partial fractions. Focuses on applications such as differential equations and accumulation problems.",
-      "past_questions": "Around 3–5 questions per session, often mixing MCQ and integer-type. Common question types: evaluating definite integrals, finding area under curve, solving DE."
-    },
-    "Matrices and Determinants": {
-      "description": "Operations with matrices, properties, types, solving linear systems via inverse matrix or Cramer's rule, evaluating determinants up to 3×3.",
-      "past_questions": "Typically 2–3 questions per exam, e.g. compute determinant, solve system of equations, evaluate inverse."
-    },
-    "Limits, Continuity & Differentiability": {
-      "description": "Understanding limit laws, epsilon‑delta definition, continuity checks, difference quotient, derivative rules, and application in curve sketching.",
-      "past_questions": "Usually 2–3 MCQs on limit evaluation, continuity points, derivative computation."
-    },
-    "Differential Equations": {
-      "description": "Formation, solving first‑order, first-degree DEs by separation of variables and integrating factors; applications to growth/decay models.",
-      "past_questions": "1–2 questions involving solving specific DEs or using DEs in practical contexts."
-    },
-    "Coordinate Geometry": {
-      "description": "Involves study of lines, circles, parabolas, ellipses, and hyperbolas. Focus on properties, standard equations, tangents, normals, and finding intersections and area enclosed.",
-      "past_questions": "About 3–4 questions per paper. Typical problems involve tangents to conics, distance from point to line, and equation finding."
-    },
-    "Three Dimensional Geometry": {
-      "description": "Includes direction cosines and ratios, equations of lines and planes, angles between them, and shortest distance between skew lines.",
-      "past_questions": "Usually 2–3 questions on finding angles, distances, or intersection lines/planes. Frequently integer type."
-    },
-    "Vector Algebra": {
-      "description": "Covers vector operations including addition, scalar and vector products, and their geometric and physical applications like force resolution and area calculations.",
-      "past_questions": "1–2 vector-based geometry or force balance questions are commonly asked."
-    },
-    "Probability and Statistics": {
-      "description": "Statistics includes mean, median, mode, variance, standard deviation. Probability covers classical definition, conditional probability, Bayes' theorem, and independent events.",
-      "past_questions": "1–2 questions appear, often involving application of Bayes' theorem or variance computation."
-    },
-    "Sequences and Series": {
-      "description": "Involves arithmetic and geometric progressions, special series like sum of squares and cubes, and concepts of convergence and divergence.",
-      "past_questions": "1–2 questions based on nth term, sum formula, or finding general term."
-    },
-    "Permutations and Combinations": {
-      "description": "Fundamental principle of counting, factorials, arrangements with or without repetition, circular permutations, and selection problems.",
-      "past_questions": "Typically 1–2 questions on arrangement, selection with conditions, and P&C-based probability."
-    },
-    "Binomial Theorem": {
-      "description": "Expansions of (a + b)^n, binomial coefficients, finding specific terms, middle term, and general term.",
-      "past_questions": "1–2 questions on identifying terms or simplifying binomial expressions."
-    },
-    "Sets, Relations and Functions": {
-      "description": "Includes operations on sets, Venn diagrams, types of relations, types and compositions of functions, domain and range, and one-one/onto functions.",
-      "past_questions": "1–2 conceptual or computational questions on function properties or set operations."
-    },
-    "Trigonometry": {
-      "description": "Covers identities, transformations, inverse trigonometric functions, solving equations, and heights and distances.",
-      "past_questions": "1–2 questions typically test identities or involve inverse function properties."
-    },
-    "Mathematical Reasoning": {
-      "description": "Deals with logical connectives, truth tables, statements, implications, and quantifiers. It is highly scoring and predictable.",
-      "past_questions": "1 fixed question per exam, often easy and based on logical equivalence or contradiction."
-    }
-  },
-  "Physics": {
-    "Modern Physics": {
-      "description": "Topics include photoelectric effect, atomic spectra, Bohr’s model, nuclear decays, mass‑energy equivalence, and semiconductors.",
-      "past_questions": "About 5 in Session 1 (~16% weightage). Frequently MCQs and integer-based on Planck’s constant, decay problems."
-    },
-    "Heat and Thermodynamics": {
-      "description": "Covers laws of thermodynamics, heat engines, entropy, PV diagrams, calorimetry and specific heats.",
-      "past_questions": "Typically 3–5 questions (10%). Numeric questions on Carnot cycles, entropy changes, calorimetry."
-    },
-    "Optics": {
-      "description": "Ray and wave optics: reflection/refraction, lens equations, interference, diffraction, resolving power, optical instruments.",
-      "past_questions": "3–4 questions (10%). Problems on lens formulas, double-slit, diffraction."
-    },
-    "Current Electricity": {
-      "description": "Ohm’s law, resistances in series/parallel, Kirchhoff’s rules, potentiometer, RC circuits, and transient in RC.",
-      "past_questions": "3–4 questions (10%), including circuit analysis and measurement instrument problems."
-    },
-    "Electrostatics": {
-      "description": "Coulomb's law, electric field, potential, Gauss’s law, and capacitors in different configurations.",
-      "past_questions": "2–3 questions, often numeric involving field calculation or energy stored in capacitors."
-    },
-    "Laws of Motion": {
-      "description": "Newton’s laws, friction, pseudo forces, pulley systems, and equilibrium conditions.",
-      "past_questions": "1–2 questions involving block systems or net force calculation."
-    },
-    "Rotational Motion": {
-      "description": "Moment of inertia, torque, angular momentum, rolling motion, and kinetic energy in rotation.",
-      "past_questions": "2 questions typical involving energy or torque equilibrium."
-    },
-    "Gravitation": {
-      "description": "Newton’s law, gravitational potential energy, satellite motion, escape velocity.",
-      "past_questions": "1 question usually from escape velocity or orbital motion."
-    },
-    "SHM and Waves": {
-      "description": "Simple harmonic motion, spring-mass system, wave equation, superposition principle, Doppler effect.",
-      "past_questions": "2–3 questions including frequency, energy and resonance concepts."
-    }
-  },
-  "Chemistry": {
-    "Chemical Thermodynamics & Equilibrium": {
-      "description": "Entails first and second law applications, Hess’s law, Gibbs free energy, chemical and ionic equilibrium, Le Chatelier’s principle.",
-      "past_questions": "1–2 questions either numeric or conceptual, e.g. calculate ΔG or predict shift in equilibrium."
-    },
-    "Electrochemistry": {
-      "description": "Redox reactions, galvanic cells, Nernst equation, EMF, concentration cells, and conductance measurements.",
-      "past_questions": "1–2 questions, often numerical on cell potentials or ion concentration dependence."
-    },
-    "Coordination Compounds": {
-      "description": "Nomenclature, isomerism, bonding theories, color, magnetic properties and industrial applications.",
-      "past_questions": "1–2 questions. Often theoretical – writing formulas or predicting geometry."
-    },
-    "Organic Chemistry – Basic Principles of GOC": {
-      "description": "Concepts of hybridization, aromaticity, reaction mechanisms (electrophilic/nucleophilic), inductive/resonance effects.",
-      "past_questions": "2–3 MCQs or integer types on mechanism steps, reactivity order."
-    },
-    "Atomic Structure": {
-      "description": "Bohr's model, quantum numbers, electronic configuration, and wave-particle duality.",
-      "past_questions": "1–2 questions often test quantum number assignment or energy level differences."
-    },
-    "Chemical Bonding and Molecular Structure": {
-      "description": "Covers types of bonds, VSEPR theory, hybridization, dipole moment, and molecular orbital theory.",
-      "past_questions": "2 questions are typical, involving hybridization and geometry."
-    },
-    "p-Block Elements": {
-      "description": "Properties and reactions of Group 13-18 elements, oxides, halides, allotropes, and anomalous behavior.",
-      "past_questions": "1–2 direct theory-based questions from group trends."
-    },
-    "Hydrocarbons": {
-      "description": "Alkanes, alkenes, alkynes, and their reactions including substitution, addition, and elimination.",
-      "past_questions": "2–3 questions, often involve mechanism or product prediction."
-    }
-  },
-  "Biology": {
-    "Cell Biology": {
-      "description": "Cell structure and function, biomolecules, cell division, and cell cycle regulation.",
-      "past_questions": "2–3 questions on cell organelles, mitosis/meiosis, and cellular processes."
-    },
-    "Genetics": {
-      "description": "Mendelian genetics, molecular basis of inheritance, gene expression, and genetic disorders.",
-      "past_questions": "2–4 questions on inheritance patterns, DNA structure, and genetic engineering."
-    },
-    "Evolution": {
-      "description": "Darwin's theory, natural selection, speciation, and evidence for evolution.",
-      "past_questions": "1–2 questions on evolutionary mechanisms and phylogeny."
-    },
-    "Plant Physiology": {
-      "description": "Photosynthesis, respiration, transport in plants, and plant hormones.",
-      "past_questions": "2–3 questions on photosynthesis pathways and plant responses."
-    },
-    "Human Physiology": {
-      "description": "Digestive, respiratory, circulatory, excretory, and nervous systems.",
-      "past_questions": "3–4 questions on system functions and regulation mechanisms."
-    },
-    "Ecology": {
-      "description": "Ecosystem structure, energy flow, biogeochemical cycles, and environmental issues.",
-      "past_questions": "1–2 questions on ecosystem dynamics and biodiversity."
-    },
-    "Reproduction": {
-      "description": "Sexual and asexual reproduction, human reproductive system, and development.",
-      "past_questions": "2–3 questions on reproductive processes and development stages."
-    },
-    "Biotechnology": {
-      "description": "Genetic engineering, DNA technology, and applications in medicine and agriculture.",
-      "past_questions": "1–2 questions on biotechnology tools and applications."
-    }
-  }
-}
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from collections.abc import Mapping
+from types import MappingProxyType
+
+# Directory holding index.json (subject -> file name) and one JSON file per subject
+SYLLABUS_DIR = os.environ.get(
+    "MCQ_SYLLABUS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "syllabus_data")
+)
+
+# Minimum seconds between checks of a file's modification time
+RELOAD_CHECK_SECONDS = 2
+
+logger = logging.getLogger(__name__)
+
+
+# Compiled, read-only view of the syllabus used for prompts and topic lists:
+#   topics   - subject -> tuple of topic names
+#   snippets - (subject, topic) -> pre-rendered prompt text for the topic
+SyllabusIndex = namedtuple("SyllabusIndex", ["topics", "snippets"])
+
+
+def build_syllabus_index(syllabus_data):
+    """Compile syllabus data into a SyllabusIndex"""
+    topics = {}
+    snippets = {}
+    for subject, subject_topics in syllabus_data.items():
+        topics[subject] = tuple(subject_topics)
+        for topic, details in subject_topics.items():
+            snippets[(subject, topic)] = (
+                f"\n- {topic}: {details['description']}"
+                f"\n  Past Questions Pattern: {details['past_questions']}"
+            )
+
+    return SyllabusIndex(MappingProxyType(topics), MappingProxyType(snippets))
+
+
+class _CachedFile:
+    """A JSON file parsed on first use and re-parsed when its mtime changes.
+
+    If a reload fails (the file is missing or half-written), the last good
+    copy keeps being served and the reload is retried on a later check.
+    """
+
+    def __init__(self, path, compile_fn=None):
+        self.path = path
+        self.compile_fn = compile_fn
+        self.mtime = None
+        self.checked_at = 0
+        self.data = None
+        self.compiled = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Return (data, compiled), reloading the file if it changed on disk"""
+        with self.lock:
+            now = time.monotonic()
+            if self.data is not None and now - self.checked_at < RELOAD_CHECK_SECONDS:
+                return self.data, self.compiled
+
+            self.checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime != self.mtime:
+                    with open(self.path, encoding="utf-8") as f:
+                        data = json.load(f)
+                    compiled = self.compile_fn(data) if self.compile_fn else None
+                    self.data, self.compiled, self.mtime = data, compiled, mtime
+            except (OSError, ValueError) as e:
+                if self.data is None:
+                    raise
+                logger.warning("Could not reload %s, keeping the last good copy: %s", self.path, e)
+            return self.data, self.compiled
+
+
+class SyllabusLoader(Mapping):
+    """Dict-like syllabus: subject -> {topic: {"description", "past_questions"}}.
+
+    Subject files are read lazily the first time a subject is used, cached,
+    and reloaded automatically when edited, so syllabi can be added or
+    changed without restarting the app.
+    """
+
+    def __init__(self, directory=SYLLABUS_DIR):
+        self.directory = directory
+        self.manifest = _CachedFile(os.path.join(directory, "index.json"))
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def _subject_files(self):
+        manifest, _ = self.manifest.get()
+        return manifest["subjects"]
+
+    def _subject_file(self, subject):
+        file_name = self._subject_files().get(subject)
+        if file_name is None:
+            return None
+        path = os.path.join(self.directory, file_name)
+        with self.lock:
+            cached = self.files.get(subject)
+            if cached is None or cached.path != path:
+                cached = _CachedFile(path, lambda data: build_syllabus_index({subject: data}))
+                self.files[subject] = cached
+            return cached
+
+    def __getitem__(self, subject):
+        cached = self._subject_file(subject)
+        if cached is None:
+            raise KeyError(subject)
+        data, _ = cached.get()
+        return data
+
+    def __iter__(self):
+        return iter(self._subject_files())
+
+    def __len__(self):
+        return len(self._subject_files())
+
+    def get_index(self, subject):
+        """Return the compiled SyllabusIndex for one subject, or None if it is unknown"""
+        cached = self._subject_file(subject)
+        if cached is None:
+            return None
+        _, index = cached.get()
+        return index
+
+
+syllabus = SyllabusLoader()
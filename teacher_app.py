@@ -1,170 +1,469 @@
 import streamlit as st
-import openai
-import json
-import requests
-import base64
-import re
+from streamlit.errors import StreamlitAPIException
 import time
-import random
 from datetime import datetime
-from syllabus import syllabus
+from syllabus import syllabus, build_syllabus_index
+import metrics
+from config import LLM_BACKEND, METRICS_HOST, METRICS_PORT
+from llm_backends import BACKENDS, get_backend, get_client, model_for_level
+from github_publisher import GitHubError, GitHubPublisher, test_file_path
+from storage import get_storage, replication_status
+from serialization import encode_test
+from publish_outbox import TestIdTaken
+from id_allocator import get_allocator
+from mcq_parser import DIFFICULTY_LEVELS, OPTION_KEYS, IncrementalQuestionParser, parse_questions, repair_questions
+from question_cache import get_cache, make_cache_key
+from question_bank import get_question_bank, question_fingerprint
+from item_stats import format_item_stats, get_item_stats
+from question_dedup import DuplicateFilter, filter_near_duplicates, get_published_index
+from prompt_planner import get_planner, estimate_tokens
+from mcq_generator import (
+    TEMPERATURE,
+    MAX_TOKENS,
+    CHUNK_SIZE,
+    ChunkResult,
+    plan_chunks,
+    stream_completion,
+    generate_chunks,
+    merge_question_sets
+)
 
-# GitHub configuration
-GITHUB_REPO = "IshantWadhwa4/data_tsmcq"
-GITHUB_PATH = "questions"  # Path where test files will be stored
+# Difficulty guidance included in the prompt for the selected level
+DIFFICULTY_GUIDANCE = {
+    "Easy": "direct application of formulas and basic concepts",
+    "Medium": "2-3 step problem solving and concept understanding",
+    "Hard": "complex multi-step problems integrating multiple concepts",
+    "Mix": "a mixture of Easy, Medium and Hard questions"
+}
+
+# Emphasis for each part of a test generated in several requests. Parts
+# often share topics and difficulty, so without this they get identical
+# prompts and return overlapping questions.
+PART_FOCUS = [
+    "numerical problems that need a calculation",
+    "conceptual questions on principles, definitions and common misconceptions",
+    "application-based questions set in experiments or real situations",
+    "questions in the style of previous-year IIT-JEE papers (2010-2025)",
+    "questions that link the topic to related concepts",
+]
+
+# Compact response format shown to the model
+QUESTION_JSON_FORMAT = (
+    '{"questions":[{"question_number":1,"question_text":"...",'
+    '"options":{"A":"...","B":"...","C":"...","D":"..."},"correct_answer":"A",'
+    '"explanation":"...","topic":"syllabus topic","subtopic":"...","difficulty":"Easy|Medium|Hard"}]}'
+)
+
+# Questions listed per page in the Question Management step
+QUESTIONS_PER_PAGE = 10
+
+# Attempts at finding an unused test ID when publishing
+TEST_ID_ATTEMPTS = 5
+
+# Characters of each existing question sent to the AI when topping up a test
+EXISTING_QUESTION_CHARS = 150
+
+# Shown when generation worked but dedup removed every question
+ALL_DUPLICATES_MESSAGE = (
+    "No new questions were left after removing near-duplicates of this test and published tests. "
+    "Tick \"Force fresh questions\" in the sidebar, or change the topics or additional information, and try again."
+)
+
+class GenerationError(Exception):
+    """Raised when no questions could be generated; the message gives the cause"""
 
 def get_topics_for_subject(subject):
     """Get topics for a given subject from syllabus"""
-    if subject in syllabus:
-        return list(syllabus[subject].keys())
-    return []
+    index = syllabus.get_index(subject)
+    return index.topics[subject] if index else ()
 
-def create_openai_prompt(subject, topics, additional_info, num_questions, level, syllabus_data):
-    """Create a detailed prompt for OpenAI to generate MCQs"""
+@metrics.timed(metrics.STAGE_SECONDS, stage="prompt")
+def create_openai_prompt(subject, topics, additional_info, num_questions, level, syllabus_data, existing_questions=None, part=1, parts=1):
+    """Create a detailed prompt for OpenAI to generate MCQs (part of parts when a test is split into chunks)"""
     
-    # Get syllabus information for selected topics
-    topic_descriptions = ""
-    for topic in topics:
-        if topic in syllabus_data[subject]:
-            topic_descriptions += f"\n- {topic}: {syllabus_data[subject][topic]['description']}"
-            topic_descriptions += f"\n  Past Questions Pattern: {syllabus_data[subject][topic]['past_questions']}"
+    # Get syllabus information for selected topics from the compiled index
+    if syllabus_data is syllabus:
+        index = syllabus.get_index(subject)
+    else:
+        index = build_syllabus_index(syllabus_data)
+    topic_descriptions = "".join(index.snippets.get((subject, topic), "") for topic in topics) if index else ""
+    
+    prompt = f"""Generate exactly {num_questions} multiple-choice questions (MCQs) for a {subject} examination.
+
+TOPICS TO COVER:{topic_descriptions or " See additional requirements"}
+
+ADDITIONAL REQUIREMENTS: {additional_info if additional_info else "None"}
+
+DIFFICULTY: {level} - {DIFFICULTY_GUIDANCE.get(level, DIFFICULTY_GUIDANCE["Mix"])}
+
+RULES: IIT-JEE level for class 11-12 students; exactly 4 options (A-D) with exactly one correct; mix numerical, conceptual and application-based questions; unambiguous; detailed explanation of the correct answer; include some previous-year IIT-JEE questions (2010-2025).{_part_instructions(part, parts)}
+
+Respond with JSON only, in this format:
+{QUESTION_JSON_FORMAT}
+"""
     
-    prompt = f"""
-Generate {num_questions} multiple-choice questions (MCQs) for {subject} examination.
-
-SUBJECT: {subject}
-
-TOPICS TO COVER:
-{topic_descriptions}
-
-ADDITIONAL REQUIREMENTS:
-{additional_info if additional_info else "None"}
-
-DIFFICULTY LEVEL: {level}
-- If Easy: Focus on direct application of formulas and basic concepts
-- If Medium: Require 2-3 step problem solving and concept understanding
-- If Hard: Complex multi-step problems requiring deep understanding and multiple concept integration
-- If Mix: Include a mixture of easy, medium, and hard questions
-
-INSTRUCTIONS:
-1. Generate exactly {num_questions} questions
-2. Each question should have exactly 4 options (A, B, C, D)
-3. Only one option should be correct
-4. Questions should be educational and test understanding
-5. Include numerical problems, conceptual questions, and application-based questions
-6. Ensure questions are unambiguous and have clear correct answers
-7. Provide detailed explanations for correct answers
-8. Make sure question must be IITJEE level 11th and 12th standard students will solve the problems.
-9. Add some previous years IITJEE exam asked questions from 2010 to 2025.
-
-FORMAT YOUR RESPONSE AS JSON:
-{{
-  "questions": [
-    {{
-      "question_number": 1,
-      "question_text": "Question text here",
-      "options": {{
-        "A": "Option A text",
-        "B": "Option B text", 
-        "C": "Option C text",
-        "D": "Option D text"
-      }},
-      "correct_answer": "A",
-      "explanation": "Detailed explanation of why this answer is correct",
-      "topic": "Specific topic from the syllabus",
-      "subtopic": "Specific subtopic if applicable",
-      "difficulty": "Easy/Medium/Hard"
-    }}
-  ]
-}}
-
-Make sure the JSON is properly formatted and can be parsed.
+    # Ask for new questions only when topping up an existing test
+    if existing_questions:
+        existing_texts = "\n".join(
+            f"- {question.get('question_text', '')[:EXISTING_QUESTION_CHARS]}"
+            for question in existing_questions
+        )
+        prompt += f"""
+The test already contains the questions below. Do NOT repeat or closely paraphrase any of them:
+{existing_texts}
 """
     return prompt
 
-def generate_mcqs(api_key, prompt):
-    """Generate MCQs using OpenAI API"""
-    try:
-        client = openai.OpenAI(api_key=api_key)
-        
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert examination question creator. Generate high-quality multiple-choice questions following the exact format requested."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=4000
+def _part_instructions(part, parts):
+    """Prompt lines that keep the parts of a chunked test from repeating each other"""
+    if parts <= 1:
+        return ""
+    focus = PART_FOCUS[(part - 1) % len(PART_FOCUS)]
+    return (
+        f"\n\nPART {part} OF {parts}: this test is generated in {parts} separate requests that may cover the same topics. "
+        f"Make most questions in this part {focus}, so they do not overlap with the other parts."
+    )
+
+def generate_chunk_questions(api_key, subject, chunks, additional_info, syllabus_data, force_fresh, existing_questions, timings, backend=LLM_BACKEND):
+    """Generate and parse chunks concurrently on the named AI backend.
+
+    Returns (question sets, shortfall per chunk, errors). A chunk's shortfall
+    counts questions that were missing or could not be repaired, and errors
+    says why any chunk produced no questions. Raises GenerationError if the
+    AI could not be reached.
+    """
+    started = time.perf_counter()
+    planner = get_planner()
+    prompts = [
+        create_openai_prompt(
+            subject,
+            chunk["topics"],
+            additional_info,
+            chunk["num_questions"],
+            chunk["level"],
+            syllabus_data,
+            existing_questions,
+            chunk.get("part", 1),
+            chunk.get("parts", 1)
         )
-        
-        return response.choices[0].message.content
+        for chunk in chunks
+    ]
+    timings["prompt"] = timings.get("prompt", 0) + time.perf_counter() - started
+    started = time.perf_counter()
+
+    # Serve repeated prompts from the response cache
+    cache = get_cache()
+    models = [model_for_level(chunk["level"]) for chunk in chunks]
+    cache_keys = [make_cache_key(prompt, model, TEMPERATURE) for prompt, model in zip(prompts, models)]
+    # A cache entry belongs to one chunk: chunks with identical prompts would otherwise
+    # all be served the same response, and dedup would drop every copy but one
+    cacheable = [key not in cache_keys[:i] for i, key in enumerate(cache_keys)]
+    results = [
+        ChunkResult(cache.get(key) if cacheable[i] and not force_fresh else None, None, None)
+        for i, key in enumerate(cache_keys)
+    ]
+    # A cached response whose questions were published after it was cached would be
+    # dropped whole by dedup, so it is evicted and the AI is asked again
+    index = get_published_index()
+    for i, result in enumerate(results):
+        if result.text and index.has_similar(
+            parse_questions(result.text, chunks[i]["num_questions"], chunks[i]["topics"], chunks[i]["level"]).questions
+        ):
+            cache.delete(cache_keys[i])
+            results[i] = ChunkResult(None, None, None)
+    pending = [i for i, result in enumerate(results) if result.text is None]
+    if not force_fresh:
+        metrics.LLM_CACHE_LOOKUPS.inc(len(results) - len(pending), result="hit")
+        metrics.LLM_CACHE_LOOKUPS.inc(len(pending), result="miss")
+
+    if pending:
+        try:
+            client = get_client(api_key, backend)
+            fresh_results = generate_chunks(
+                client,
+                [prompts[i] for i in pending],
+                max_tokens=[
+                    planner.max_tokens(subject, chunks[i]["level"], chunks[i]["num_questions"])
+                    for i in pending
+                ],
+                models=[models[i] for i in pending]
+            )
+        except Exception as e:
+            raise GenerationError(str(e)) from e
+        for i, result in zip(pending, fresh_results):
+            results[i] = result
+    elapsed = time.perf_counter() - started
+    timings["llm"] = timings.get("llm", 0) + elapsed
+    metrics.STAGE_SECONDS.observe(elapsed, stage="llm")
+    started = time.perf_counter()
+
+    question_sets = []
+    shortfalls = []
+    errors = []
+    for i, (response, usage, error) in enumerate(results):
+        expected = chunks[i]["num_questions"]
+        mcq_data = parse_mcq_response(response, expected, chunks[i]["topics"], chunks[i]["level"]) if response else None
+        if mcq_data and 'questions' in mcq_data:
+            question_sets.append(mcq_data['questions'])
+            shortfalls.append(max(0, expected - len(mcq_data['questions'])))
+            if usage:
+                planner.record_usage(subject, chunks[i]["level"], usage.completion_tokens, len(mcq_data['questions']))
+            if i in pending and cacheable[i] and not mcq_data['missing']:
+                cache.put(cache_keys[i], response)
+        else:
+            shortfalls.append(expected)
+            errors.append(str(error) if error else "no valid questions in the AI response")
+    timings["parse"] = timings.get("parse", 0) + time.perf_counter() - started
+
+    return question_sets, shortfalls, errors
+
+@metrics.timed(metrics.STAGE_SECONDS, stage="generate")
+def generate_questions(api_key, subject, topics, additional_info, num_questions, level, syllabus_data, force_fresh=False, existing_questions=None, timings=None, report=None, backend=LLM_BACKEND):
+    """Generate a full question list on the named AI backend, splitting large tests into concurrent chunks.
+
+    Questions that are missing or cannot be repaired are requested once more,
+    for just the affected chunks. If timings is a dict, seconds spent building
+    prompts, waiting for the AI, parsing and removing near-duplicates are
+    added to its "prompt", "llm", "parse" and "dedup" entries. If report is a
+    dict, it gets the "requested" count, the "missing" questions the AI did
+    not deliver, the near-"duplicates" removed and the "errors" that failed
+    any part of the test. Raises GenerationError if no questions could be
+    generated.
+    """
+    if timings is None:
+        timings = {}
+    if report is None:
+        report = {}
+    report["requested"] = num_questions
+    existing_questions = existing_questions or []
+    chunk_size = min(CHUNK_SIZE, get_planner().questions_per_request(subject, level))
+    chunks = plan_chunks(topics, num_questions, level, chunk_size)
+    question_sets, shortfalls, errors = generate_chunk_questions(
+        api_key, subject, chunks, additional_info, syllabus_data, force_fresh, existing_questions, timings, backend
+    )
+    if not question_sets:
+        raise GenerationError("; ".join(dict.fromkeys(errors)))
+
+    # Targeted regeneration: ask again only for what each chunk is short of
+    retry_chunks = [dict(chunk, num_questions=shortfall) for chunk, shortfall in zip(chunks, shortfalls) if shortfall]
+    if retry_chunks:
+        try:
+            retried_sets, shortfalls, errors = generate_chunk_questions(
+                api_key,
+                subject,
+                retry_chunks,
+                additional_info,
+                syllabus_data,
+                force_fresh,
+                existing_questions + merge_question_sets(question_sets),
+                timings,
+                backend
+            )
+            question_sets.extend(retried_sets)
+        except GenerationError as e:
+            errors = [str(e)]
+    report["errors"] = list(dict.fromkeys(errors))
+
+    report["missing"] = sum(shortfalls)
+
+    # Drop questions that nearly repeat each other, the existing questions or a published test
+    started = time.perf_counter()
+    questions, duplicates = filter_near_duplicates(
+        merge_question_sets(question_sets),
+        existing_questions,
+        get_published_index()
+    )
+    elapsed = time.perf_counter() - started
+    timings["dedup"] = timings.get("dedup", 0) + elapsed
+    metrics.STAGE_SECONDS.observe(elapsed, stage="dedup")
+    report["duplicates"] = len(duplicates)
+
+    return merge_question_sets([questions])
+
+def top_up_questions(api_key, existing_questions, target_count, report=None):
+    """Generate only the questions needed to bring the test up to target_count.
+
+    report is filled in as for generate_questions. Raises GenerationError if
+    no questions were found in the bank or generated.
+    """
+    if report is None:
+        report = {}
+    questions_needed = target_count - len(existing_questions)
+    if questions_needed <= 0:
+        return []
+    
+    subject = st.session_state.selected_subject
+    topics = st.session_state.selected_topics
+    level = st.session_state.difficulty_level
+    
+    # Prefer unused questions from the bank, skipping ones already in the test
+    new_questions = []
+    if st.session_state.get('use_question_bank'):
+        new_questions = get_question_bank().find_questions(
+            subject,
+            topics,
+            level,
+            questions_needed,
+            query=st.session_state.additional_info,
+            exclude=[question_fingerprint(question) for question in existing_questions]
+        )
+        questions_needed -= len(new_questions)
+    
+    if questions_needed > 0:
+        try:
+            new_questions.extend(generate_questions(
+                api_key,
+                subject,
+                topics,
+                st.session_state.additional_info,
+                questions_needed,
+                level,
+                syllabus,
+                existing_questions=existing_questions + new_questions,
+                report=report,
+                backend=st.session_state.llm_backend
+            ))
+        except GenerationError as e:
+            if not new_questions:
+                raise
+            report["errors"] = [str(e)]
+    
+    return new_questions
+
+def stream_questions(api_key, prompt, force_fresh=False, max_tokens=MAX_TOKENS, subject=None, level=None, topics=(), expected_count=None, backend=LLM_BACKEND):
+    """Stream MCQs from OpenAI, yielding each question as soon as it is complete and repaired.
+
+    The response is cached only if it produced expected_count valid questions,
+    so a truncated stream is not replayed on the next run.
+    """
+    model = model_for_level(level or "Mix")
+    cache_key = make_cache_key(prompt, model, TEMPERATURE)
+    if not force_fresh:
+        cached = get_cache().get(cache_key)
+        if cached:
+            questions, _, _ = repair_questions(IncrementalQuestionParser().feed(cached), topics, level)
+            # Published since it was cached: dedup would drop it, so ask the AI again
+            if get_published_index().has_similar(questions):
+                get_cache().delete(cache_key)
+                cached = None
+        metrics.LLM_CACHE_LOOKUPS.inc(result="hit" if cached else "miss")
+        if cached:
+            yield from questions
+            return
+    
+    parser = IncrementalQuestionParser()
+    
+    try:
+        client = get_client(api_key, backend)
+        received = []
+        questions_found = 0
+        for text in stream_completion(client, prompt, max_tokens=max_tokens, model=model):
+            received.append(text)
+            questions, _, _ = repair_questions(parser.feed(text), topics, level)
+            for question in questions:
+                questions_found += 1
+                yield question
+        if questions_found:
+            response = "".join(received)
+            if questions_found >= (expected_count or 1):
+                get_cache().put(cache_key, response)
+            if subject:
+                get_planner().record_usage(subject, level, estimate_tokens(response), questions_found)
     except Exception as e:
         st.error(f"Error generating questions: {str(e)}")
-        return None
 
-def parse_mcq_response(response_text):
-    """Parse the OpenAI response to extract MCQ data"""
-    try:
-        # Try to extract JSON from the response
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            json_text = json_match.group()
-            mcq_data = json.loads(json_text)
-            return mcq_data
-        else:
-            st.error("Could not find valid JSON in the response")
-            return None
-    except json.JSONDecodeError as e:
-        st.error(f"Error parsing JSON response: {str(e)}")
+@metrics.timed(metrics.STAGE_SECONDS, stage="parse")
+def parse_mcq_response(response_text, expected_count=None, topics=(), level=None):
+    """Parse the OpenAI response to extract MCQ data, repairing what can be fixed"""
+    result = parse_questions(response_text, expected_count, topics, level)
+    
+    # Rejected questions are counted in the chunk's shortfall
+    if not result.questions:
         return None
+    
+    return {"questions": result.questions, "missing": result.missing}
 
 def generate_test_id(teacher_name, date_str):
-    """Generate test ID in format: teachername_YYYYMMDD_XX"""
-    # Clean teacher name (remove spaces, convert to uppercase)
-    clean_name = teacher_name.replace(" ", "").upper()
-    # Generate random 2-digit number
-    random_num = random.randint(10, 99)
-    return f"{clean_name}_{date_str}_{random_num}"
-
-def save_test_to_github(test_data, test_id, teacher_token):
-    """Save test data to GitHub repository"""
+    """Generate test ID in format: teachername_YYYYMMDD_XXX"""
+    return get_allocator().reserve(teacher_name, date_str)[0]
+
+def reserve_test_ids(teacher_name, date_str, count):
+    """Reserve a batch of unique test IDs for bulk publishing"""
+    return get_allocator().reserve(teacher_name, date_str, count)
+
+def index_published_questions(test_data):
+    """Remember a published test's questions so later tests do not repeat them.
+
+    Questions enter the reusable question bank here, once the teacher has
+    reviewed and published them, so questions deleted as wrong are never
+    offered again.
+    """
+    get_published_index().add_questions(test_data['subject'], test_data['questions'])
+    get_question_bank().add_questions(test_data['subject'], test_data['questions'])
+
+def build_test_data(teacher_name, test_id, subject, topics, additional_info, difficulty, exam_duration_minutes, questions):
+    """Build the published test document, teacher name first"""
+    return {
+        "teacher_name": teacher_name,
+        "test_id": test_id,
+        "created_at": datetime.now().isoformat(),
+        "subject": subject,
+        "topics": topics,
+        "additional_info": additional_info,
+        "difficulty": difficulty,
+        "total_questions": len(questions),
+        "exam_duration_minutes": exam_duration_minutes,
+        "questions": questions
+    }
+
+@metrics.timed(metrics.STAGE_SECONDS, stage="github_save")
+def save_tests_to_github(tests, teacher_token):
+    """Save many tests to GitHub in a single commit. tests maps test IDs to test data."""
     try:
-        # GitHub API endpoint
-        url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{GITHUB_PATH}/{test_id}.json"
-        
-        # Prepare the content
-        content = json.dumps(test_data, indent=2)
-        encoded_content = base64.b64encode(content.encode()).decode()
-        
-        # API request data
-        data = {
-            "message": f"Add test: {test_id}",
-            "content": encoded_content,
-            "branch": "main"  # or your default branch
+        publisher = GitHubPublisher(teacher_token)
+        files = {
+            test_file_path(test_id): encode_test(test_data)
+            for test_id, test_data in tests.items()
         }
-        
-        # Headers
-        headers = {
-            "Authorization": f"token {teacher_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        
-        # Make the request
-        response = requests.put(url, json=data, headers=headers)
-        
-        if response.status_code == 201:
-            return True, "Test successfully saved to GitHub"
-        else:
-            return False, f"Error saving to GitHub: {response.status_code} - {response.text}"
+        message = f"Add {len(tests)} tests: {', '.join(sorted(tests))}"
+        commit_sha = publisher.commit_files(files, message)
+        for test_data in tests.values():
+            index_published_questions(test_data)
+        return True, f"{len(tests)} tests saved to GitHub in commit {commit_sha[:7]}"
     
+    except GitHubError as e:
+        return False, f"Error saving to GitHub: {str(e)}"
     except Exception as e:
-        return False, f"Error saving test to GitHub: {str(e)}"
+        return False, f"Error saving tests to GitHub: {str(e)}"
 
-def display_question_editor(question, question_num, key_prefix):
-    """Display editable question interface"""
+@metrics.timed(metrics.STAGE_SECONDS, stage="publish")
+def publish_test(test_data, test_id, teacher_token):
+    """Save test data to the configured storage backend"""
+    try:
+        storage = get_storage(teacher_token)
+        storage.save(test_id, test_data)
+        index_published_questions(test_data)
+        return True, f"Test saved to {storage.name} storage"
+    
+    except TestIdTaken:
+        raise
+    except GitHubError as e:
+        return False, f"Error saving to GitHub: {str(e)}"
+    except Exception as e:
+        return False, f"Error saving test: {str(e)}"
+
+def display_question_editor(question, question_num, key_prefix, stats=None):
+    """Display editable question interface. Edits are batched in a form and only submitted on save."""
     st.markdown(f"### Question {question_num}")
+    if stats:
+        st.caption(format_item_stats(stats))
     
-    with st.container():
+    # Tolerate malformed questions (e.g. from an old bank entry) instead of crashing the editor
+    options = question.get('options') if isinstance(question.get('options'), dict) else {}
+    answer = question.get('correct_answer')
+    level = question.get('difficulty')
+    
+    with st.form(key=f"{key_prefix}_form_{question_num}"):
         # Question text editor
         question_text = st.text_area(
             "Question Text:",
@@ -178,24 +477,24 @@ def display_question_editor(question, question_num, key_prefix):
         with col1:
             option_a = st.text_input(
                 "Option A:",
-                value=question.get('options', {}).get('A', ''),
+                value=str(options.get('A', '')),
                 key=f"{key_prefix}_option_a_{question_num}"
             )
             option_b = st.text_input(
                 "Option B:",
-                value=question.get('options', {}).get('B', ''),
+                value=str(options.get('B', '')),
                 key=f"{key_prefix}_option_b_{question_num}"
             )
         
         with col2:
             option_c = st.text_input(
                 "Option C:",
-                value=question.get('options', {}).get('C', ''),
+                value=str(options.get('C', '')),
                 key=f"{key_prefix}_option_c_{question_num}"
             )
             option_d = st.text_input(
                 "Option D:",
-                value=question.get('options', {}).get('D', ''),
+                value=str(options.get('D', '')),
                 key=f"{key_prefix}_option_d_{question_num}"
             )
         
@@ -204,8 +503,8 @@ def display_question_editor(question, question_num, key_prefix):
         with col3:
             correct_answer = st.selectbox(
                 "Correct Answer:",
-                options=['A', 'B', 'C', 'D'],
-                index=['A', 'B', 'C', 'D'].index(question.get('correct_answer', 'A')),
+                options=list(OPTION_KEYS),
+                index=OPTION_KEYS.index(answer) if answer in OPTION_KEYS else 0,
                 key=f"{key_prefix}_correct_{question_num}"
             )
         
@@ -219,8 +518,8 @@ def display_question_editor(question, question_num, key_prefix):
         with col5:
             difficulty = st.selectbox(
                 "Difficulty:",
-                options=['Easy', 'Medium', 'Hard'],
-                index=['Easy', 'Medium', 'Hard'].index(question.get('difficulty', 'Medium')),
+                options=list(DIFFICULTY_LEVELS),
+                index=DIFFICULTY_LEVELS.index(level) if level in DIFFICULTY_LEVELS else 1,
                 key=f"{key_prefix}_difficulty_{question_num}"
             )
         
@@ -232,12 +531,12 @@ def display_question_editor(question, question_num, key_prefix):
             height=80
         )
         
-        # Remove button
-        remove_button = st.button(
-            "🗑️ Remove Question",
-            key=f"{key_prefix}_remove_{question_num}",
-            type="secondary"
-        )
+        # Save and remove buttons
+        col6, col7 = st.columns(2)
+        with col6:
+            save_button = st.form_submit_button("💾 Save Question", type="primary")
+        with col7:
+            remove_button = st.form_submit_button("🗑️ Remove Question", type="secondary")
         
         # Return updated question data
         updated_question = {
@@ -256,13 +555,110 @@ def display_question_editor(question, question_num, key_prefix):
             "difficulty": difficulty
         }
         
-        return updated_question, remove_button
+        return updated_question, save_button, remove_button
+
+def display_question_summary(question, question_num, key_prefix, stats=None):
+    """Display a read-only question summary with edit and remove buttons, and item statistics if any"""
+    col1, col2, col3 = st.columns([8, 1, 1])
+    with col1:
+        st.markdown(f"**Q{question_num}.** {question.get('question_text', '')}")
+        st.caption(
+            f"Answer: {question.get('correct_answer', '')} | "
+            f"Topic: {question.get('topic', '')} | "
+            f"Difficulty: {question.get('difficulty', '')}"
+        )
+        if stats:
+            st.caption(format_item_stats(stats))
+    with col2:
+        edit_button = st.button("✏️", key=f"{key_prefix}_edit_{question_num}", help="Edit question")
+    with col3:
+        remove_button = st.button("🗑️", key=f"{key_prefix}_remove_{question_num}", help="Remove question")
+    
+    return edit_button, remove_button
+
+def remove_question(index):
+    """Remove a question from the test and renumber the rest"""
+    questions = st.session_state.mcq_questions
+    questions.pop(index)
+    for i in range(index, len(questions)):
+        questions[i]['question_number'] = i + 1
+    st.session_state.editing_question = None
+
+def rerun_question_page():
+    """Rerun only the question page fragment, or the whole app outside a fragment rerun"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+@st.fragment
+def display_question_page():
+    """Display one page of question summaries, with live widgets only for the question being edited"""
+    if 'editing_question' not in st.session_state:
+        st.session_state.editing_question = None
+    if 'question_page' not in st.session_state:
+        st.session_state.question_page = 0
+    
+    questions = st.session_state.mcq_questions
+    total_pages = max(1, -(-len(questions) // QUESTIONS_PER_PAGE))
+    page = min(st.session_state.question_page, total_pages - 1)
+    
+    if total_pages > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Previous", disabled=page == 0):
+                st.session_state.question_page = page - 1
+                rerun_question_page()
+        with col2:
+            st.markdown(f"Page {page + 1} of {total_pages}")
+        with col3:
+            if st.button("Next ➡️", disabled=page == total_pages - 1):
+                st.session_state.question_page = page + 1
+                rerun_question_page()
+    
+    start = page * QUESTIONS_PER_PAGE
+    page_indexes = range(start, min(start + QUESTIONS_PER_PAGE, len(questions)))
+    
+    # How questions reused from earlier tests performed with students
+    fingerprints = {i: question_fingerprint(questions[i]) for i in page_indexes}
+    page_stats = get_item_stats().stats_for_fingerprints(fingerprints.values())
+    
+    for i in page_indexes:
+        question = questions[i]
+        stats = page_stats.get(fingerprints[i])
+        st.markdown("---")
+        
+        if st.session_state.editing_question == i:
+            updated_question, save_clicked, remove_clicked = display_question_editor(
+                question, i + 1, "edit", stats
+            )
+            
+            if remove_clicked:
+                # The question count shown outside this section changes, so rerun everything
+                remove_question(i)
+                st.rerun()
+            
+            if save_clicked:
+                # Apply only this question's changes
+                if updated_question != question:
+                    questions[i] = updated_question
+                st.session_state.editing_question = None
+                rerun_question_page()
+        else:
+            edit_clicked, remove_clicked = display_question_summary(question, i + 1, "summary", stats)
+            
+            if edit_clicked:
+                st.session_state.editing_question = i
+                rerun_question_page()
+            if remove_clicked:
+                remove_question(i)
+                st.rerun()
 
 def display_new_question_form(question_num, key_prefix):
     """Display form for adding new question"""
     st.markdown(f"### Add New Question {question_num}")
     
-    with st.container():
+    with st.form(key=f"{key_prefix}_new_form_{question_num}"):
         # Question text
         question_text = st.text_area(
             "Question Text:",
@@ -322,9 +718,8 @@ def display_new_question_form(question_num, key_prefix):
         )
         
         # Add button
-        add_button = st.button(
+        add_button = st.form_submit_button(
             "➕ Add This Question",
-            key=f"{key_prefix}_add_{question_num}",
             type="primary"
         )
         
@@ -349,6 +744,52 @@ def display_new_question_form(question_num, key_prefix):
         
         return None, add_button
 
+def display_generation_report(report=None):
+    """Warnings from a generation or top up (by default the last one, kept until the next)"""
+    if report is None:
+        report = st.session_state.get('generation_report')
+    if not report:
+        return
+    for error in report.get("errors", []):
+        st.warning(f"A batch of questions could not be generated: {error}")
+    if report.get("missing"):
+        st.warning(f"{report['missing']} of {report['requested']} questions were missing or invalid in the AI response. You can add the missing questions manually.")
+    if report.get("duplicates"):
+        st.warning(f"Removed {report['duplicates']} question(s) that nearly repeat this test or a published test. You can top up to replace them.")
+
+def display_metrics_panel():
+    """Admin panel with this server's stage timings, AI token usage and GitHub calls"""
+    with st.sidebar.expander("📈 Metrics"):
+        snapshot = metrics.snapshot()
+        rows = ["| Histogram | Count | Mean | p95 ≤ |", "|---|---|---|---|"]
+        for name, metric in snapshot.items():
+            if metric["type"] != "histogram":
+                continue
+            for sample in metric["samples"]:
+                labels = " ".join(str(value) for value in sample["labels"].values())
+                mean = sample["sum"] / sample["count"]
+                rows.append(f"| {name[4:]} {labels} | {sample['count']} | {mean:.3g} | {metrics.quantile(sample, 0.95):g} |")
+        if len(rows) > 2:
+            st.markdown("\n".join(rows))
+        else:
+            st.caption("Nothing recorded yet")
+        
+        for name, metric in snapshot.items():
+            if metric["type"] != "counter":
+                continue
+            for sample in metric["samples"]:
+                labels = ", ".join(f"{key}={value}" for key, value in sample["labels"].items())
+                st.caption(f"{name[4:]} ({labels}): {sample['value']:g}")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Prometheus", metrics.render_prometheus(), file_name="metrics.prom")
+        with col2:
+            st.download_button("JSON", metrics.render_json(), file_name="metrics.json")
+        if st.button("Reset metrics"):
+            metrics.reset()
+            st.rerun()
+
 def main():
     st.set_page_config(
         page_title="Teacher MCQ Creator",
@@ -367,6 +808,15 @@ def main():
     if 'test_published' not in st.session_state:
         st.session_state.test_published = False
     
+    # Instrumentation is opt-in (MCQ_METRICS); the panel only appears when it is on
+    if metrics.is_enabled():
+        if METRICS_PORT:
+            try:
+                metrics.start_http_server(METRICS_PORT, METRICS_HOST)
+            except OSError as e:
+                st.sidebar.warning(f"Metrics endpoint not started on {METRICS_HOST}:{METRICS_PORT}: {e}")
+        display_metrics_panel()
+    
     # Step 1: Initial Configuration
     if not st.session_state.questions_generated:
         st.header("🤖 AI Question Generation")
@@ -376,7 +826,7 @@ def main():
         st.sidebar.header("📝 Test Configuration")
         
         # Subject selection
-        subjects = ["Mathematics", "Physics", "Chemistry", "Biology"]
+        subjects = list(syllabus)
         selected_subject = st.sidebar.selectbox(
             "Select Subject:",
             subjects,
@@ -419,6 +869,27 @@ def main():
             help="Choose the difficulty level for the test"
         )
         
+        # Streaming mode
+        stream_generation = st.sidebar.checkbox(
+            "Show questions as they are generated",
+            value=False,
+            help="Stream questions from the AI and display each one as soon as it is ready"
+        )
+        
+        # Cache override
+        force_fresh = st.sidebar.checkbox(
+            "Force fresh questions",
+            value=False,
+            help="Skip previously generated questions for the same settings and ask the AI again"
+        )
+        
+        # Question bank reuse
+        use_question_bank = st.sidebar.checkbox(
+            "Reuse questions from question bank",
+            value=True,
+            help="Fill the test with matching questions from earlier published tests and only ask the AI for the rest"
+        )
+        
         # Teacher Information
         st.sidebar.header("👨‍🏫 Teacher Information")
         teacher_name = st.sidebar.text_input(
@@ -449,6 +920,16 @@ def main():
         # API Configuration
         st.sidebar.header("🔑 API Configuration")
         
+        # AI backend (OpenAI, a self-hosted OpenAI-compatible server, or the mock server)
+        backend_names = list(BACKENDS)
+        llm_backend = st.sidebar.selectbox(
+            "AI Backend:",
+            options=backend_names,
+            index=backend_names.index(LLM_BACKEND) if LLM_BACKEND in backend_names else 0,
+            format_func=lambda name: BACKENDS[name].label,
+            help="Where questions are generated. Models per difficulty are set in config.py."
+        )
+        
         # OpenAI API Key
         openai_api_key = st.sidebar.text_input(
             "OpenAI API Key:",
@@ -469,7 +950,7 @@ def main():
                 st.error("Please enter your teacher name")
                 return
             
-            if not openai_api_key:
+            if not openai_api_key and get_backend(llm_backend).requires_key:
                 st.error("Please provide your OpenAI API key")
                 return
             
@@ -490,35 +971,122 @@ def main():
             st.session_state.difficulty_level = difficulty_level
             st.session_state.teacher_token = teacher_token
             st.session_state.exam_duration_minutes = exam_duration_minutes
+            st.session_state.openai_api_key = openai_api_key
+            st.session_state.llm_backend = llm_backend
+            st.session_state.use_question_bank = use_question_bank
             
-            # Show loading spinner
-            with st.spinner("Generating questions... This may take a few moments."):
-                # Create prompt
-                prompt = create_openai_prompt(
-                    selected_subject, 
-                    selected_topics, 
-                    additional_info, 
-                    num_questions, 
-                    difficulty_level, 
-                    syllabus
+            # Fill as many questions as possible from the local question bank
+            bank_questions = []
+            if use_question_bank:
+                bank_questions = get_question_bank().find_questions(
+                    selected_subject,
+                    selected_topics,
+                    difficulty_level,
+                    num_questions,
+                    query=additional_info
                 )
+            questions_needed = num_questions - len(bank_questions)
+            
+            if questions_needed <= 0:
+                st.session_state.mcq_questions = merge_question_sets([bank_questions])
+                st.session_state.generation_report = None
+                st.session_state.questions_generated = True
+                st.rerun()
+            
+            if stream_generation:
+                # Stream questions into session state and preview them as they arrive.
+                # Tests over one request's token budget are streamed chunk by chunk.
+                st.session_state.mcq_questions = merge_question_sets([bank_questions])
+                planner = get_planner()
+                chunks = plan_chunks(
+                    selected_topics,
+                    questions_needed,
+                    difficulty_level,
+                    min(CHUNK_SIZE, planner.questions_per_request(selected_subject, difficulty_level))
+                )
+                status = st.empty()
+                status.info("Generating questions... They will appear below as soon as each one is ready.")
+                preview = st.container()
                 
-                # Generate MCQs
-                response = generate_mcqs(openai_api_key, prompt)
-                
-                if response:
-                    # Parse response
-                    mcq_data = parse_mcq_response(response)
+                generated = []
+                duplicate_filter = DuplicateFilter(bank_questions, get_published_index())
+                duplicates = 0
+                for chunk in chunks:
+                    prompt = create_openai_prompt(
+                        selected_subject,
+                        chunk["topics"],
+                        additional_info,
+                        chunk["num_questions"],
+                        chunk["level"],
+                        syllabus,
+                        part=chunk["part"],
+                        parts=chunk["parts"]
+                    )
+                    max_tokens = planner.max_tokens(selected_subject, chunk["level"], chunk["num_questions"])
                     
-                    if mcq_data and 'questions' in mcq_data:
-                        st.session_state.mcq_questions = mcq_data['questions']
-                        st.session_state.questions_generated = True
-                        st.success("✅ Questions generated successfully! You can now edit, remove, or add questions.")
-                        st.rerun()
+                    for question in stream_questions(openai_api_key, prompt, force_fresh, max_tokens, selected_subject, chunk["level"], chunk["topics"], chunk["num_questions"], llm_backend):
+                        if duplicate_filter.check(question):
+                            duplicates += 1
+                            continue
+                        generated.append(question)
+                        question['question_number'] = len(st.session_state.mcq_questions) + 1
+                        st.session_state.mcq_questions.append(question)
+                        with preview:
+                            with st.expander(f"Question {question['question_number']}: {question.get('question_text', '')[:80]}"):
+                                for letter, option in question.get('options', {}).items():
+                                    st.markdown(f"**{letter}.** {option}")
+                        status.info(f"Received {len(st.session_state.mcq_questions)} of {num_questions} questions...")
+                
+                report = {
+                    "requested": questions_needed,
+                    "missing": max(0, questions_needed - len(generated) - duplicates),
+                    "duplicates": duplicates
+                }
+                if generated:
+                    st.session_state.generation_report = report
+                    st.session_state.questions_generated = True
+                    st.rerun()
+                else:
+                    status.empty()
+                    if duplicates:
+                        display_generation_report(report)
+                        st.error(ALL_DUPLICATES_MESSAGE)
                     else:
-                        st.error("Failed to parse generated questions. Please try again.")
+                        st.error("Failed to generate questions. Please check your API key and try again.")
+                return
+            
+            # Show loading spinner
+            with st.spinner("Generating questions... This may take a few moments."):
+                # Generate MCQs (large tests are split into concurrent chunks)
+                report = {}
+                try:
+                    questions = generate_questions(
+                        openai_api_key,
+                        selected_subject,
+                        selected_topics,
+                        additional_info,
+                        questions_needed,
+                        difficulty_level,
+                        syllabus,
+                        force_fresh,
+                        existing_questions=bank_questions,
+                        report=report,
+                        backend=llm_backend
+                    )
+                except GenerationError as e:
+                    st.error(f"Failed to generate questions: {e}")
+                    return
+
+                if questions:
+                    st.session_state.mcq_questions = merge_question_sets([bank_questions, questions])
+                    st.session_state.generation_report = report
+                    st.session_state.questions_generated = True
+                    st.success("✅ Questions generated successfully! You can now edit, remove, or add questions.")
+                    st.rerun()
                 else:
-                    st.error("Failed to generate questions. Please check your API key and try again.")
+                    # GenerationError covers AI failures, so every question was a near-duplicate
+                    display_generation_report(report)
+                    st.error(ALL_DUPLICATES_MESSAGE)
     
     # Step 2: Question Management
     elif st.session_state.questions_generated and not st.session_state.test_published:
@@ -526,34 +1094,51 @@ def main():
         st.markdown(f"**Teacher:** {st.session_state.teacher_name}")
         st.markdown(f"**Subject:** {st.session_state.selected_subject}")
         st.markdown(f"**Topics:** {', '.join(st.session_state.selected_topics)}")
+        display_generation_report()
         
-        # Question editing interface
-        questions_to_remove = []
-        updated_questions = []
+        # Question editing interface (reruns only this section while editing)
+        display_question_page()
         
-        # Edit existing questions
-        for i, question in enumerate(st.session_state.mcq_questions):
-            st.markdown("---")
-            updated_question, remove_clicked = display_question_editor(
-                question, i + 1, "edit"
-            )
-            
-            if remove_clicked:
-                questions_to_remove.append(i)
-            else:
-                updated_questions.append(updated_question)
+        # Top up section
+        st.markdown("---")
+        st.header("🔁 Top Up Questions")
         
-        # Remove questions if requested
-        if questions_to_remove:
-            for index in sorted(questions_to_remove, reverse=True):
-                st.session_state.mcq_questions.pop(index)
-            st.rerun()
+        # Questions added by hand can take a test past the usual 50
+        question_count = len(st.session_state.mcq_questions)
+        target_count = st.number_input(
+            "Target number of questions:",
+            min_value=1,
+            max_value=max(50, question_count),
+            value=max(st.session_state.num_questions, question_count),
+            help="Generate only the questions needed to reach this number"
+        )
+        questions_needed = target_count - question_count
         
-        # Update question numbers
-        for i, question in enumerate(updated_questions):
-            question['question_number'] = i + 1
+        if questions_needed > 0:
+            st.info(f"{questions_needed} question(s) needed to reach {target_count}")
         
-        st.session_state.mcq_questions = updated_questions
+        if st.button(f"🤖 Top Up to {target_count}", disabled=questions_needed <= 0):
+            report = {}
+            with st.spinner(f"Generating {questions_needed} more question(s)..."):
+                try:
+                    new_questions = top_up_questions(
+                        st.session_state.openai_api_key,
+                        st.session_state.mcq_questions,
+                        target_count,
+                        report
+                    )
+                except GenerationError as e:
+                    new_questions = None
+                    st.error(f"Failed to generate additional questions: {e}")
+            
+            if new_questions:
+                st.session_state.mcq_questions = merge_question_sets([st.session_state.mcq_questions, new_questions])
+                st.session_state.generation_report = report
+                st.success(f"✅ Added {len(new_questions)} question(s)!")
+                st.rerun()
+            elif new_questions is not None:
+                display_generation_report(report)
+                st.error("No new questions were left after removing near-duplicates. Please try again, or add questions by hand below.")
         
         # Add new question section
         st.markdown("---")
@@ -599,27 +1184,30 @@ def main():
                 st.error("Cannot publish test with no questions!")
                 return
             
-            # Generate test ID
-            date_str = datetime.now().strftime("%Y%m%d")
-            test_id = generate_test_id(st.session_state.teacher_name, date_str)
-            
-            # Create test data with teacher name first
-            test_data = {
-                "teacher_name": st.session_state.teacher_name,
-                "test_id": test_id,
-                "created_at": datetime.now().isoformat(),
-                "subject": st.session_state.selected_subject,
-                "topics": st.session_state.selected_topics,
-                "additional_info": st.session_state.additional_info,
-                "difficulty": st.session_state.difficulty_level,
-                "total_questions": len(st.session_state.mcq_questions),
-                "exam_duration_minutes": st.session_state.exam_duration_minutes,
-                "questions": st.session_state.mcq_questions
-            }
-            
-            # Save to GitHub
-            with st.spinner("Publishing test to GitHub..."):
-                success, message = save_test_to_github(test_data, test_id, st.session_state.teacher_token)
+            # Save to the configured storage (GitHub uploads continue in the background)
+            with st.spinner("Publishing test..."):
+                date_str = datetime.now().strftime("%Y%m%d")
+                for _ in range(TEST_ID_ATTEMPTS):
+                    # Generate test ID (reserved when the test is queued for upload)
+                    test_id = generate_test_id(st.session_state.teacher_name, date_str)
+                    
+                    # Create test data with teacher name first
+                    test_data = build_test_data(
+                        st.session_state.teacher_name,
+                        test_id,
+                        st.session_state.selected_subject,
+                        st.session_state.selected_topics,
+                        st.session_state.additional_info,
+                        st.session_state.difficulty_level,
+                        st.session_state.exam_duration_minutes,
+                        st.session_state.mcq_questions
+                    )
+                    
+                    try:
+                        success, message = publish_test(test_data, test_id, st.session_state.teacher_token)
+                        break
+                    except TestIdTaken:
+                        success, message = False, "Could not reserve a unique test ID"
                 
                 if success:
                     st.session_state.test_published = True
@@ -638,6 +1226,20 @@ def main():
         st.success(f"📋 **Test ID:** `{st.session_state.published_test_id}`")
         st.info("Share this Test ID with your students")
         
+        # Background GitHub upload status
+        upload_status = replication_status(st.session_state.published_test_id)
+        if upload_status and upload_status.startswith(("pending", "retrying")):
+            if upload_status == "pending":
+                st.warning("⏳ Uploading test to GitHub in the background...")
+            else:
+                st.warning(f"⏳ GitHub upload {upload_status}")
+            if st.button("🔄 Refresh Upload Status"):
+                st.rerun()
+        elif upload_status == "done":
+            st.success("☁️ Test uploaded to GitHub")
+        elif upload_status:
+            st.error(f"❌ GitHub upload {upload_status}")
+        
         # Display test summary
         st.markdown("### 📊 Test Summary")
         col1, col2 = st.columns(2)
@@ -668,8 +1270,11 @@ def main():
             st.session_state.questions_generated = False
             st.session_state.mcq_questions = []
             st.session_state.test_published = False
+            st.session_state.generation_report = None
             if 'published_test_id' in st.session_state:
                 del st.session_state.published_test_id
+            st.session_state.editing_question = None
+            st.session_state.question_page = 0
             st.rerun()
     
     # Information section
@@ -685,14 +1290,14 @@ def main():
         - ✅ AI-powered question generation
         - ✅ Full question editing capabilities
         - ✅ Add/remove questions manually
-        - ✅ Test ID format: `TEACHERNAME_YYYYMMDD_XX`
+        - ✅ Test ID format: `TEACHERNAME_YYYYMMDD_XXX`
         - ✅ Automatic GitHub storage
         - ✅ Student-friendly test sharing
         
         ### Important Notes:
         - Teacher name is required and will be part of the Test ID
         - All questions can be edited after AI generation
-        - Test ID format: Teacher name + Date + Random number
+        - Test ID format: Teacher name + Date + Sequence number
         - Share the Test ID with students to take the test
         """)
 
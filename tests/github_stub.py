@@ -0,0 +1,156 @@
+"""Local stand-in for the parts of the GitHub REST API the publisher uses.
+
+Runs a real HTTP server on 127.0.0.1 so requests go through the same
+session, headers and status handling as against api.github.com. Only one
+branch is modelled. GET responses carry an ETag and answer 304 to a
+matching If-None-Match.
+"""
+import base64
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class GitHubStub:
+    """Repository state plus the server that exposes it"""
+
+    def __init__(self, repo="owner/repo", branch="main"):
+        self.repo = repo
+        self.branch = branch
+        self.ids = itertools.count(1)
+        self.files = {}     # path -> bytes, as of the branch head
+        self.trees = {"t0": {}}
+        self.commits = {"c0": {"sha": "c0", "tree": {"sha": "t0"}, "parents": []}}
+        self.blobs = {}
+        self.head = "c0"
+        self.requests = []  # (method, path, status)
+        self.before_patch = None  # Called once before the next ref update, e.g. to simulate a concurrent push
+        self.latency = 0          # Seconds each GET takes, so concurrent requests overlap
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, method, pattern, status=None):
+        """Number of requests whose path matches pattern (and status, if given)"""
+        return sum(
+            1 for m, path, code in self.requests
+            if m == method and re.search(pattern, path) and (status is None or code == status)
+        )
+
+    def push(self, files):
+        """Commit files directly, as another client would"""
+        with self.lock:
+            self._commit(files, [self.head])
+
+    def _commit(self, files, parents):
+        tree_sha = f"t{next(self.ids)}"
+        base = dict(self.trees[self.commits[parents[0]]["tree"]["sha"]])
+        base.update(files)
+        self.trees[tree_sha] = base
+        sha = f"c{next(self.ids)}"
+        self.commits[sha] = {"sha": sha, "tree": {"sha": tree_sha}, "parents": parents}
+        self.head = sha
+        self.files = dict(base)
+        return sha
+
+    def _handler(self):
+        stub = self
+        prefix = f"/repos/{self.repo}/"
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, body=None, etag=None, raw=None):
+                data = raw if raw is not None else (json.dumps(body).encode() if body is not None else b"")
+                stub.requests.append((self.command, self.path.split("?")[0][len(prefix):], status))
+                self.send_response(status)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _reply_cached(self, body=None, raw=None):
+                data = raw if raw is not None else json.dumps(body, sort_keys=True).encode()
+                etag = f'"{hashlib.md5(data).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self._reply(304, etag=etag)
+                self._reply(200, body, etag, raw)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def _path(self):
+                return self.path.split("?")[0][len(prefix):]
+
+            def do_GET(self):
+                path = self._path()
+                time.sleep(stub.latency)
+                with stub.lock:
+                    if path == f"git/ref/heads/{stub.branch}":
+                        return self._reply_cached({"object": {"sha": stub.head}})
+                    if path.startswith("git/commits/") and path[12:] in stub.commits:
+                        return self._reply_cached(stub.commits[path[12:]])
+                    if path.startswith("contents/") and path[9:] in stub.files:
+                        content = stub.files[path[9:]]
+                        if "raw" in (self.headers.get("Accept") or ""):
+                            return self._reply_cached(raw=content)
+                        return self._reply_cached({"content": base64.b64encode(content).decode()})
+                self._reply(404, {"message": "Not Found"})
+
+            def do_POST(self):
+                path, body = self._path(), self._body()
+                with stub.lock:
+                    if path == "git/blobs":
+                        sha = f"b{next(stub.ids)}"
+                        stub.blobs[sha] = base64.b64decode(body["content"])
+                        return self._reply(201, {"sha": sha})
+                    if path == "git/trees":
+                        files = dict(stub.trees[body["base_tree"]])
+                        for entry in body["tree"]:
+                            files[entry["path"]] = (
+                                entry["content"].encode() if "content" in entry else stub.blobs[entry["sha"]]
+                            )
+                        sha = f"t{next(stub.ids)}"
+                        stub.trees[sha] = files
+                        return self._reply(201, {"sha": sha})
+                    if path == "git/commits":
+                        sha = f"c{next(stub.ids)}"
+                        stub.commits[sha] = {"sha": sha, "tree": {"sha": body["tree"]}, "parents": body["parents"]}
+                        return self._reply(201, {"sha": sha})
+                self._reply(404, {"message": "Not Found"})
+
+            def do_PATCH(self):
+                body = self._body()
+                hook, stub.before_patch = stub.before_patch, None
+                if hook:
+                    hook()
+                with stub.lock:
+                    commit = stub.commits[body["sha"]]
+                    if commit["parents"] != [stub.head]:
+                        return self._reply(422, {"message": "Update is not a fast forward"})
+                    stub.head = commit["sha"]
+                    stub.files = dict(stub.trees[commit["tree"]["sha"]])
+                self._reply(200, {"object": {"sha": body["sha"]}})
+
+            def do_PUT(self):
+                path, body = self._path(), self._body()
+                with stub.lock:
+                    file_path = path[len("contents/"):]
+                    if file_path in stub.files:
+                        return self._reply(422, {"message": "sha wasn't supplied"})
+                    stub._commit({file_path: base64.b64decode(body["content"])}, [stub.head])
+                self._reply(201, {"content": {"path": file_path}})
+
+        return Handler
@@ -0,0 +1,110 @@
+import pytest
+
+import github_publisher
+from github_publisher import GitHubError, GitHubPublisher
+from github_stub import GitHubStub
+
+
+@pytest.fixture
+def stub():
+    github_publisher._etags.clear()
+    stub = GitHubStub()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def publisher(stub):
+    return GitHubPublisher("token", repo=stub.repo, branch=stub.branch, api_url=stub.url)
+
+
+def test_commit_files_writes_every_file_in_one_commit(stub, publisher):
+    sha = publisher.commit_files({"questions/A.json": "{}", "questions/B.json": b'{"b":1}'}, "Add 2 tests")
+
+    assert stub.head == sha
+    assert stub.commits[sha]["parents"] == ["c0"]
+    assert stub.files == {"questions/A.json": b"{}", "questions/B.json": b'{"b":1}'}
+    assert stub.count("POST", "^git/commits$") == 1
+    assert stub.count("PATCH", "^git/refs/heads/main$") == 1
+
+
+def test_commit_files_uploads_binary_content_as_blobs(stub, publisher):
+    content = b"\x28\xb5\x2f\xfd\x00\xff"
+    publisher.commit_files({"questions/A.json.zst": content, "questions/B.json": "{}"}, "Add tests")
+
+    assert stub.files["questions/A.json.zst"] == content
+    assert stub.count("POST", "^git/blobs$") == 1
+
+
+def test_commit_files_rebuilds_on_new_head_after_422(stub, publisher):
+    moved_head = []
+    stub.before_patch = lambda: (stub.push({"questions/OTHER.json": b"{}"}), moved_head.append(stub.head))
+
+    sha = publisher.commit_files({"questions/A.json": "{}"}, "Add test")
+
+    assert stub.count("PATCH", "^git/refs/heads/main$", 422) == 1
+    assert stub.count("PATCH", "^git/refs/heads/main$", 200) == 1
+    assert stub.head == sha
+    # The retry is built on the concurrent commit, so neither change is lost
+    assert stub.commits[sha]["parents"] == moved_head
+    assert set(stub.files) == {"questions/OTHER.json", "questions/A.json"}
+
+
+def test_commit_files_gives_up_after_last_attempt(stub, publisher):
+    stub.before_patch = lambda: stub.push({"questions/OTHER.json": b"{}"})
+
+    with pytest.raises(GitHubError) as error:
+        publisher.commit_files({"questions/A.json": "{}"}, "Add test", attempts=1)
+
+    assert error.value.status_code == 422
+    assert "questions/A.json" not in stub.files
+
+
+def test_commit_files_reuses_cached_head_commit_on_304(stub, publisher):
+    publisher.commit_files({"questions/A.json": "{}"}, "First")
+    head = stub.head
+    first_body = publisher._get(f"git/commits/{head}")
+
+    publisher.commit_files({"questions/B.json": "{}"}, "Second")
+
+    # The head commit was already cached, so GitHub answers 304 and the cached tree is used
+    assert stub.count("GET", f"^git/commits/{head}$", 200) == 1
+    assert stub.count("GET", f"^git/commits/{head}$", 304) == 1
+    assert stub.commits[stub.head]["parents"] == [first_body["sha"]]
+    assert set(stub.files) == {"questions/A.json", "questions/B.json"}
+
+
+def test_ref_is_revalidated_and_reused_while_branch_is_unchanged(stub, publisher):
+    first = publisher._get("git/ref/heads/main")
+    second = publisher._get("git/ref/heads/main")
+
+    assert first == second == {"object": {"sha": "c0"}}
+    assert stub.count("GET", "^git/ref/heads/main$", 304) == 1
+
+
+def test_etag_cache_evicts_least_recently_used(stub, publisher, monkeypatch):
+    monkeypatch.setattr(github_publisher, "ETAG_CACHE_ENTRIES", 2)
+    for name in ("A", "B", "C"):
+        stub.push({f"questions/{name}.json": b"{}"})
+    shas = [sha for sha in stub.commits if sha != "c0"]
+
+    publisher._get(f"git/commits/{shas[0]}")
+    publisher._get(f"git/commits/{shas[1]}")
+    publisher._get(f"git/commits/{shas[0]}")  # Most recently used again
+    publisher._get(f"git/commits/{shas[2]}")
+
+    cached = {url.rsplit("/", 1)[1] for url, _ in github_publisher._etags}
+    assert cached == {shas[0], shas[2]}
+
+
+def test_put_and_fetch_file(stub, publisher):
+    publisher.put_file("questions/A.json", '{"a":1}', "Add test")
+
+    assert publisher.get_file("questions/A.json") == b'{"a":1}'
+    assert publisher.get_file("questions/MISSING.json") is None
+    content, etag = publisher.fetch_file("questions/A.json")
+    assert content == b'{"a":1}'
+    assert publisher.fetch_file("questions/A.json", etag) == (None, etag)
+    with pytest.raises(GitHubError) as error:
+        publisher.put_file("questions/A.json", "{}", "Add again")
+    assert error.value.status_code == 422
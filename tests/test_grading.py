@@ -0,0 +1,63 @@
+import numpy as np
+
+from grading import UNANSWERED, encode_answers, grade, grade_submissions, load_answer_key
+
+TEST = {"questions": [
+    {"correct_answer": "A", "topic": "Motion", "difficulty": "Easy"},
+    {"correct_answer": "C", "topic": "Waves", "difficulty": "Hard"},
+    {"correct_answer": "B", "topic": "Motion", "difficulty": "Easy"},
+    {"correct_answer": "?", "topic": "Waves", "difficulty": "Hard"},
+]}
+
+
+def test_encode_answers_accepts_lists_and_numbered_mappings():
+    responses = encode_answers([
+        {"answers": ["A", "c", None, " b "]},
+        {"answers": {"1": "B", "3": "b", 4: "D"}},
+    ], 4)
+
+    assert responses.tolist() == [[0, 2, UNANSWERED, 1], [1, UNANSWERED, 1, 3]]
+
+
+def test_encode_answers_leaves_malformed_entries_unanswered():
+    responses = encode_answers([
+        {"answers": {"x": "A", "2": "C", "9": "A", "": "B", None: "A"}},
+        {"answers": "ACB"},
+        "not a submission",
+        {"student_name": "No answers"},
+        {"answers": ["A", "Z", 7, "B", "C"]},
+    ], 4)
+
+    assert responses.tolist() == [
+        [UNANSWERED, 2, UNANSWERED, UNANSWERED],
+        [UNANSWERED] * 4,
+        [UNANSWERED] * 4,
+        [UNANSWERED] * 4,
+        [0, UNANSWERED, UNANSWERED, 1],
+    ]
+
+
+def test_grade_scores_by_topic_and_difficulty():
+    key = load_answer_key(TEST)
+    report = grade(key, encode_answers([{"answers": ["A", "C", "B", "A"]}, {"answers": ["B", "C"]}], 4))
+
+    assert report.totals.tolist() == [3, 1]
+    assert np.allclose(report.percentages, [75.0, 25.0])
+    assert key.topics == ("Motion", "Waves")
+    assert report.topic_scores.tolist() == [[2, 1], [0, 1]]
+    assert key.difficulties == ("Easy", "Hard")
+    assert report.difficulty_scores.tolist() == [[2, 1], [0, 1]]
+
+
+def test_question_without_valid_key_is_never_correct():
+    report = grade(load_answer_key(TEST), encode_answers([{"answers": [None, None, None, None]}], 4))
+
+    assert report.totals.tolist() == [0]
+
+
+def test_grade_submissions_reports_totals_per_group():
+    scores = grade_submissions(TEST, [{"answers": {"1": "A", "bad": "C"}}])
+
+    assert scores[0]["correct_answers"] == 1
+    assert scores[0]["score_percentage"] == 25.0
+    assert scores[0]["by_topic"] == {"Motion": {"correct": 1, "total": 2}, "Waves": {"correct": 0, "total": 2}}
@@ -0,0 +1,30 @@
+import pytest
+
+from mcq_generator import plan_chunks
+
+
+def test_small_test_is_one_chunk_with_the_requested_level():
+    assert plan_chunks(["a", "b"], 10, "Mix", 10) == [
+        {"topics": ["a", "b"], "num_questions": 10, "level": "Mix", "part": 1, "parts": 1}
+    ]
+
+
+@pytest.mark.parametrize("num_questions, chunk_size", [(11, 10), (20, 10), (35, 10), (20, 5)])
+def test_mix_test_gets_every_difficulty_in_equal_shares(num_questions, chunk_size):
+    chunks = plan_chunks(["a"], num_questions, "Mix", chunk_size)
+
+    totals = {}
+    for chunk in chunks:
+        assert chunk["num_questions"] <= chunk_size
+        totals[chunk["level"]] = totals.get(chunk["level"], 0) + chunk["num_questions"]
+    assert set(totals) == {"Easy", "Medium", "Hard"}
+    assert sum(totals.values()) == num_questions
+    assert max(totals.values()) - min(totals.values()) <= 1
+
+
+def test_chunks_are_numbered_and_spread_topics():
+    chunks = plan_chunks(["a", "b", "c", "d"], 25, "Hard", 10)
+
+    assert [chunk["num_questions"] for chunk in chunks] == [9, 8, 8]
+    assert [(chunk["part"], chunk["parts"]) for chunk in chunks] == [(1, 3), (2, 3), (3, 3)]
+    assert [chunk["topics"] for chunk in chunks] == [["a", "d"], ["b"], ["c"]]
@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+from mcq_parser import IncrementalQuestionParser, normalize_answer, parse_questions
+
+NUMERIC = {"A": "2", "B": "3", "C": "4", "D": "5"}
+WORDS = {"A": "Paris", "B": "Rome", "C": "Oslo", "D": "Bern"}
+
+
+@pytest.mark.parametrize("value, options, expected", [
+    ("5", NUMERIC, "D"),          # Option text, not a valid position
+    ("b", WORDS, "B"),
+    ("(C)", WORDS, "C"),
+    ("Option D", WORDS, "D"),
+    ("2", WORDS, "B"),            # Position
+    ("rome", WORDS, "B"),         # Option text
+    ("C) 4", NUMERIC, "C"),       # Label and text
+    ("Answer: C - Oslo", WORDS, "C"),
+    ("Lisbon", WORDS, None),
+])
+def test_normalize_answer(value, options, expected):
+    assert normalize_answer(value, options) == expected
+
+
+@pytest.mark.parametrize("value", ["4", 4, "2", "C) 5"])
+def test_ambiguous_or_contradictory_answer_is_not_guessed(value):
+    # "4" is option C's text but also the fourth option, D
+    assert normalize_answer(value, NUMERIC) is None
+
+
+def test_ambiguous_answer_rejects_the_question():
+    response = '{"questions": [{"question_text": "2 + 2?", "options": %s, "correct_answer": "4"}]}' % (
+        str(NUMERIC).replace("'", '"')
+    )
+    result = parse_questions(response, 1)
+
+    assert result.questions == []
+    assert result.missing == [1]
+    assert "invalid correct_answer '4'" in result.rejected[0][1]
+
+
+def question(number, text=None, **fields):
+    return dict({
+        "question_number": number,
+        "question_text": text or f"Question {number}?",
+        "options": {"A": "1", "B": "2", "C": "3", "D": "4"},
+        "correct_answer": "A",
+        "difficulty": "Easy",
+    }, **fields)
+
+
+def response(*questions):
+    return json.dumps({"questions": list(questions)})
+
+
+def test_parses_fenced_response_wrapped_in_prose():
+    text = "Sure! Here are your questions:\n```json\n" + response(question(1), question(2)) + "\n```\nGood luck {:)]"
+    result = parse_questions(text, 2)
+
+    assert [q["question_number"] for q in result.questions] == [1, 2]
+    assert result.missing == []
+    assert result.rejected == []
+
+
+def test_truncated_response_keeps_complete_questions_and_reports_the_rest():
+    text = response(question(1), question(2), question(3))
+    result = parse_questions(text[:text.index('"question_number": 3') + 30], 3)
+
+    assert [q["question_number"] for q in result.questions] == [1, 2]
+    assert result.missing == [3]
+
+
+def test_braces_quotes_and_escapes_inside_strings_do_not_confuse_the_parser():
+    tricky = 'Solve {x | x > 0] and "quote" \\\\ with } and ] inside'
+    result = parse_questions(response(question(1, tricky), question(2)), 2)
+
+    assert result.questions[0]["question_text"] == tricky
+    assert len(result.questions) == 2
+
+
+def test_streamed_character_by_character_matches_whole_response():
+    text = "```json\n" + response(question(1, 'Has "quotes" and {braces}'), question(2)) + "\n```"
+    parser = IncrementalQuestionParser()
+    streamed = [q for char in text for q in parser.feed(char)]
+
+    assert streamed == IncrementalQuestionParser().feed(text)
+    assert len(streamed) == 2
+
+
+def test_prose_with_unbalanced_brackets_before_the_json_is_skipped():
+    text = "Note: options] are (A-D}.\n" + response(question(1))
+
+    assert len(parse_questions(text, 1).questions) == 1
+
+
+def test_top_level_array_and_nested_non_question_objects():
+    text = json.dumps([question(1, metadata={"source": "AI"}), {"note": "not a question"}])
+    result = parse_questions(text)
+
+    assert len(result.questions) == 1
+    assert result.questions[0]["metadata"] == {"source": "AI"}
+
+
+def test_repairs_common_deviations():
+    listed = question(1, options=["1", "2", "3", "4"], correct_answer="(b)")
+    del listed["difficulty"]
+    result = parse_questions(response(listed, question(2, difficulty="moderate")), 2, topics=("Algebra",), level="Hard")
+
+    first, second = result.questions
+    assert first["options"] == {"A": "1", "B": "2", "C": "3", "D": "4"}
+    assert first["correct_answer"] == "B"
+    assert first["difficulty"] == "Hard"
+    assert first["topic"] == "Algebra"
+    assert second["difficulty"] == "Medium"
+    assert result.repaired == 2
+
+
+def test_irreparable_question_is_rejected_and_reported_missing():
+    result = parse_questions(response(question(1), question(2, options={"A": "1"})), 2)
+
+    assert [q["question_number"] for q in result.questions] == [1]
+    assert result.missing == [2]
+    assert "missing option B" in result.rejected[0][1]
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+import publish_outbox
+from publish_outbox import PublishOutbox
+
+
+class RecordingBackend:
+    def __init__(self, saved, token):
+        self.saved = saved
+        self.token = token
+
+    def save(self, test_id, test_data):
+        self.saved.append((test_id, self.token))
+
+
+@pytest.fixture
+def saved():
+    return []
+
+
+@pytest.fixture
+def make_outbox(tmp_path, saved):
+    def make(default_token=None):
+        # Jobs are drained with process_next() so the tests do not race a worker thread
+        outbox = PublishOutbox(lambda name, token: RecordingBackend(saved, token),
+                               path=str(tmp_path / "outbox.db"), default_token=default_token)
+        outbox.start = lambda: None
+        return outbox
+    return make
+
+
+def test_job_is_only_claimed_by_the_process_holding_its_token(make_outbox, saved):
+    queued_by, other = make_outbox(), make_outbox()
+    queued_by.enqueue("T1", "github", {}, token="secret")
+
+    assert other.process_next() is False
+    assert other.get_status("T1")["status"] == "pending"
+
+    assert queued_by.process_next() is True
+    assert saved == [("T1", "secret")]
+    assert queued_by.get_status("T1")["status"] == "done"
+
+
+def test_default_token_lets_any_process_upload(make_outbox, saved):
+    make_outbox().enqueue("T1", "github", {}, token="secret")
+
+    assert make_outbox(default_token="env").process_next() is True
+    assert saved == [("T1", "env")]
+
+
+def test_jobs_without_a_token_backend_are_claimed_by_anyone(make_outbox, saved):
+    make_outbox().enqueue("T1", "sqlite", {})
+
+    assert make_outbox().process_next() is True
+    assert saved == [("T1", None)]
+
+
+def test_held_job_waits_for_release(make_outbox, saved):
+    outbox = make_outbox()
+    outbox.enqueue("T1", "sqlite", {}, hold=True)
+    assert outbox.process_next() is False
+
+    outbox.release("T1")
+    assert outbox.process_next() is True
+    assert saved == [("T1", None)]
+
+
+def test_cancel_frees_the_test_id(make_outbox):
+    outbox = make_outbox()
+    outbox.enqueue("T1", "sqlite", {}, hold=True)
+    with pytest.raises(publish_outbox.TestIdTaken):
+        outbox.enqueue("T1", "sqlite", {})
+
+    outbox.cancel("T1")
+    assert outbox.get_status("T1") is None
+    outbox.enqueue("T1", "sqlite", {})
+
+
+def test_new_process_leaves_live_in_flight_jobs_alone(make_outbox, monkeypatch):
+    outbox = make_outbox()
+    outbox.enqueue("T1", "sqlite", {})
+    with outbox._connect() as conn:
+        conn.execute("UPDATE outbox SET status = 'in_flight', updated_at = ?", (time.time(),))
+
+    assert make_outbox().get_status("T1")["status"] == "in_flight"
+
+    monkeypatch.setattr(publish_outbox, "IN_FLIGHT_TIMEOUT", 0)
+    assert make_outbox().get_status("T1")["status"] == "pending"
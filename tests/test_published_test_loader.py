@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+
+import pytest
+
+from github_publisher import GitHubPublisher
+from github_publisher import test_file_path as file_path  # Not named test_* so pytest does not collect it
+from github_stub import GitHubStub
+from published_test_loader import PublishedTestLoader
+from serialization import encode_test
+
+TEST = {"test_id": "T1", "subject": "Physics", "questions": [{"question_text": "Q?"}]}
+CONTENTS = r"^contents/"
+
+
+@pytest.fixture
+def stub():
+    stub = GitHubStub()
+    stub.push({file_path("T1", "json"): encode_test(TEST, "json")})
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def make_loader(stub, tmp_path):
+    def make(**kwargs):
+        publisher = GitHubPublisher("token", repo=stub.repo, branch=stub.branch, api_url=stub.url)
+        return PublishedTestLoader(publisher, cache_dir=str(tmp_path / "cache"), encoding="json", **kwargs)
+    return make
+
+
+def test_concurrent_loads_share_one_upstream_fetch(stub, make_loader):
+    loader = make_loader()
+    stub.latency = 0.2
+    barrier = threading.Barrier(50)
+    results = []
+
+    def load():
+        barrier.wait()
+        results.append(loader.load("T1"))
+
+    threads = [threading.Thread(target=load) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stub.count("GET", CONTENTS) == 1
+    assert len(results) == 50 and all(result["subject"] == "Physics" for result in results)
+
+
+def test_fresh_entry_is_served_from_memory(stub, make_loader):
+    loader = make_loader()
+    loader.load("T1")
+    loader.load("T1")
+
+    assert stub.count("GET", CONTENTS) == 1
+
+
+def test_stale_entry_is_revalidated_with_304(stub, make_loader):
+    loader = make_loader(revalidate_seconds=0)
+    first = loader.load("T1")
+
+    assert loader.load("T1") == first
+    assert stub.count("GET", CONTENTS, 304) == 1
+
+    stub.push({file_path("T1", "json"): encode_test(dict(TEST, subject="Chemistry"), "json")})
+    assert loader.load("T1")["subject"] == "Chemistry"
+    assert stub.count("GET", CONTENTS, 200) == 2
+
+
+def test_disk_cache_lets_a_new_loader_revalidate(stub, make_loader):
+    make_loader().load("T1")
+
+    assert make_loader().load("T1")["subject"] == "Physics"
+    assert stub.count("GET", CONTENTS, 304) == 1
+
+
+def test_deleted_test_is_evicted(stub, make_loader, tmp_path):
+    loader = make_loader(revalidate_seconds=0)
+    loader.load("T1")
+    assert os.listdir(tmp_path / "cache") == ["T1.json"]
+
+    with stub.lock:
+        del stub.files[file_path("T1", "json")]
+    assert loader.load("T1") is None
+    assert "T1" not in loader.memory
+    assert os.listdir(tmp_path / "cache") == []
+
+
+def test_falls_back_to_legacy_json_file(stub, make_loader):
+    stub.push({file_path("OLD", "json"): json.dumps(dict(TEST, test_id="OLD"), indent=2).encode()})
+    loader = make_loader()
+    loader.encoding = "json.gz"
+
+    assert loader.load("OLD")["test_id"] == "OLD"
+    assert stub.count("GET", CONTENTS, 404) == 1
+
+
+def test_serves_cached_copy_when_github_is_down(stub, make_loader):
+    loader = make_loader(revalidate_seconds=0)
+    loader.load("T1")
+    stub.close()
+
+    assert loader.load("T1")["subject"] == "Physics"
+
+
+def test_rejects_malformed_ids_without_a_request(stub, make_loader):
+    assert make_loader().load("../secrets") is None
+    assert stub.requests == []
@@ -0,0 +1,74 @@
+import pytest
+
+from question_dedup import (
+    DuplicateFilter,
+    PublishedQuestionIndex,
+    estimate_similarity,
+    filter_near_duplicates,
+    question_signature,
+)
+
+
+def question(text, options=("12", "15", "18", "21")):
+    return {"question_text": text, "options": dict(zip("ABCD", options)), "correct_answer": "A"}
+
+
+ORIGINAL = question("A train travels 120 km in 2 hours. What is its average speed in km per hour?")
+REWORDED = question("A train travels 120 km in 2 hours. What is its average speed in km/h?")
+REORDERED = question(ORIGINAL["question_text"], ("21", "18", "15", "12"))
+UNRELATED = question("Which gas do plants absorb from the air during photosynthesis?", ("Oxygen", "Nitrogen", "CO2", "Argon"))
+
+
+def similarity(a, b):
+    return float(estimate_similarity(question_signature(a), question_signature(b)[None, :])[0])
+
+
+@pytest.fixture
+def index(tmp_path):
+    return PublishedQuestionIndex(str(tmp_path / "index.db"))
+
+
+def test_signature_ignores_option_order_case_and_punctuation():
+    assert similarity(ORIGINAL, REORDERED) == 1.0
+    assert similarity(ORIGINAL, question(ORIGINAL["question_text"].upper().replace("?", "!"))) == 1.0
+
+
+def test_rewording_is_similar_and_unrelated_question_is_not():
+    assert similarity(ORIGINAL, REWORDED) >= 0.7
+    assert similarity(ORIGINAL, UNRELATED) < 0.3
+
+
+def test_threshold_decides_what_counts_as_a_duplicate():
+    score = similarity(ORIGINAL, REWORDED)
+
+    assert DuplicateFilter([ORIGINAL], threshold=score).check(REWORDED)
+    assert DuplicateFilter([ORIGINAL], threshold=score + 0.01).check(REWORDED) is None
+
+
+def test_filter_remembers_kept_questions():
+    duplicate_filter = DuplicateFilter()
+
+    assert duplicate_filter.check(ORIGINAL) is None
+    assert "in this test" in duplicate_filter.check(REORDERED)
+    assert duplicate_filter.check(UNRELATED) is None
+
+
+def test_published_questions_are_found_through_the_index(index):
+    index.add_questions("Physics", [ORIGINAL])
+    index.add_questions("Physics", [ORIGINAL])  # Already indexed, ignored
+
+    text, score = index.find_similar(question_signature(REWORDED))
+    assert text == ORIGINAL["question_text"] and score >= 0.7
+    assert index.find_similar(question_signature(UNRELATED)) is None
+    assert index.has_similar([UNRELATED, REWORDED])
+    assert not index.has_similar([UNRELATED])
+
+
+def test_filter_near_duplicates_splits_kept_and_dropped(index):
+    index.add_questions("Physics", [ORIGINAL])
+    kept, duplicates = filter_near_duplicates([REWORDED, UNRELATED, UNRELATED], index=index)
+
+    assert kept == [UNRELATED]
+    assert [q for q, _ in duplicates] == [REWORDED, UNRELATED]
+    assert "published question" in duplicates[0][1]
+    assert "in this test" in duplicates[1][1]
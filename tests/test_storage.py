@@ -0,0 +1,25 @@
+import json
+
+import pytest
+
+from serialization import SCHEMA_VERSION
+from storage import SQLiteStorage
+
+TEST = {"test_id": "T1", "subject": "Physics", "questions": [{"question_text": "Ünïcode ∑ q?"}]}
+
+
+@pytest.mark.parametrize("encoding", ["json", "json.gz"])
+def test_sqlite_rows_are_encoded_and_versioned(tmp_path, encoding):
+    storage = SQLiteStorage(str(tmp_path / "tests.db"), encoding)
+    storage.save("T1", TEST)
+
+    assert storage.load("T1") == dict(TEST, schema_version=SCHEMA_VERSION)
+    assert storage.load("T2") is None
+
+
+def test_sqlite_reads_rows_saved_as_plain_json(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "tests.db"))
+    with storage._connect() as conn:
+        conn.execute("INSERT INTO tests (test_id, data, updated_at) VALUES (?, ?, 0)", ("OLD", json.dumps(TEST)))
+
+    assert storage.load("OLD") == TEST
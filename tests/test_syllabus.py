@@ -0,0 +1,50 @@
+import json
+import os
+
+import pytest
+
+import syllabus
+from syllabus import SyllabusLoader
+
+PHYSICS = {"Motion": {"description": "Speed and velocity", "past_questions": "Graphs"}}
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(syllabus, "RELOAD_CHECK_SECONDS", 0)
+    (tmp_path / "index.json").write_text(json.dumps({"subjects": {"Physics": "physics.json"}}))
+    (tmp_path / "physics.json").write_text(json.dumps(PHYSICS))
+    return tmp_path
+
+
+def test_reloads_edited_subject_file(directory):
+    loader = SyllabusLoader(str(directory))
+    assert list(loader["Physics"]) == ["Motion"]
+
+    path = directory / "physics.json"
+    path.write_text(json.dumps(dict(PHYSICS, Waves={"description": "d", "past_questions": "p"})))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+
+    assert list(loader["Physics"]) == ["Motion", "Waves"]
+    assert "Waves" in loader.get_index("Physics").topics["Physics"]
+
+
+def test_keeps_last_good_copy_when_file_is_half_written_or_deleted(directory):
+    loader = SyllabusLoader(str(directory))
+    assert loader["Physics"] == PHYSICS
+
+    path = directory / "physics.json"
+    path.write_text('{"Motion": {"descr')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert loader["Physics"] == PHYSICS
+
+    path.unlink()
+    assert loader["Physics"] == PHYSICS
+    assert loader.get_index("Physics").topics["Physics"] == ("Motion",)
+
+
+def test_missing_file_raises_when_never_loaded(directory):
+    (directory / "physics.json").unlink()
+
+    with pytest.raises(FileNotFoundError):
+        SyllabusLoader(str(directory))["Physics"]